@@ -0,0 +1,188 @@
+import threading
+import time
+from typing import Callable, NamedTuple, Optional
+
+import numpy as np
+
+
+class FeatureSnapshot(NamedTuple):
+    """Immutable audio features for one analysis block"""
+    seq: int
+    timestamp: float
+    energy: float
+    spectrum: np.ndarray
+    bands: np.ndarray
+    onset: bool = False
+    beat: bool = False
+    beats: int = 0          # Beats detected so far, to catch beats between frames
+    confidence: float = 0.0
+    tempo: float = 0.0
+    capture_time: float = 0.0  # perf_counter() time the hop's first new sample was captured
+
+
+def capture_time(time_info, frames: int, sample_rate: int, fallback_latency: float = 0.0) -> float:
+    """perf_counter() time the last sample of a callback block was captured.
+
+    Uses PortAudio's ADC timestamp when the host API provides one; otherwise
+    assumes the block arrived ``fallback_latency`` seconds after capture.
+    """
+    now = time.perf_counter()
+    adc = getattr(time_info, 'inputBufferAdcTime', 0.0) if time_info is not None else 0.0
+    if adc:
+        # Stream clock -> perf_counter: the last sample is frames/rate after the first
+        return now - (time_info.currentTime - adc) + frames / sample_rate
+    return now - fallback_latency
+
+
+class AudioRingBuffer:
+    """Single-producer/single-consumer ring of mono float32 samples.
+
+    The producer (the sounddevice callback) only copies into preallocated
+    storage and then advances ``write_pos``; the consumer advances
+    ``read_pos``. Both counters grow monotonically and each is written by one
+    side only, so no lock is needed. When the producer overwrites samples the
+    next window still needs (including its overlap with the previous one),
+    those samples are dropped and ``overflows`` is incremented. Each write
+    also publishes the capture time of its newest sample, from which the
+    capture time of any buffered sample can be estimated.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = int(capacity)
+        self.buffer = np.zeros(self.capacity, dtype=np.float32)
+        self.write_pos = 0
+        self.read_pos = 0
+        self.overflows = 0
+        self.history = 0  # Window length minus hop, published by the consumer
+        self.stamp = (0, 0.0)  # (write_pos, capture time of the sample before it)
+
+    def available(self) -> int:
+        return self.write_pos - self.read_pos
+
+    def lapped(self, write_pos: int) -> bool:
+        """Whether writing up to ``write_pos`` overwrites samples the next window reads"""
+        # Overlapping windows also reread ``history`` samples before read_pos
+        return write_pos - self.capacity > max(0, self.read_pos - self.history)
+
+    def write(self, samples: np.ndarray, capture_time: float = None):
+        """Copy samples in (producer side); ``capture_time`` is that of the last sample"""
+        n = len(samples)
+        if n > self.capacity:
+            samples = samples[-self.capacity:]
+            n = self.capacity
+        start = self.write_pos % self.capacity
+        first = min(n, self.capacity - start)
+        self.buffer[start:start + first] = samples[:first]
+        if first < n:
+            self.buffer[:n - first] = samples[first:]
+        if self.lapped(self.write_pos + n):
+            self.overflows += 1
+        self.write_pos += n
+        # One reference swap, so the consumer never sees a torn pair
+        self.stamp = (self.write_pos, time.perf_counter() if capture_time is None else capture_time)
+
+    def capture_time(self, position: int, sample_rate: int) -> float:
+        """Estimated capture time of the sample just before ``position``"""
+        stamp_pos, stamp_time = self.stamp
+        return stamp_time - (stamp_pos - position) / sample_rate
+
+    def read(self, out: np.ndarray) -> bool:
+        """Fill ``out`` with the next unread samples (consumer side)"""
+        return self.read_window(out, len(out))
+
+    def read_window(self, out: np.ndarray, hop: int) -> bool:
+        """Advance by ``hop`` samples and fill ``out`` with the samples ending there.
+
+        With ``hop < len(out)`` successive windows overlap; samples from
+        before the first write read as silence.
+        """
+        n = len(out)
+        self.history = max(0, n - hop)
+        if self.lapped(self.write_pos):
+            # Producer lapped us (counted in write): skip to the oldest window still intact
+            self.read_pos = self.write_pos - self.capacity + self.history
+        if self.available() < hop:
+            return False
+        end = self.read_pos + hop
+        lead = max(0, n - end)
+        if lead:
+            out[:lead] = 0
+        start = (end - n + lead) % self.capacity
+        count = n - lead
+        first = min(count, self.capacity - start)
+        out[lead:lead + first] = self.buffer[start:start + first]
+        if first < count:
+            out[lead + first:] = self.buffer[:count - first]
+        self.read_pos = end
+        return True
+
+    def reset(self):
+        self.read_pos = self.write_pos
+
+
+class AnalysisThread(threading.Thread):
+    """Consumes the ring buffer hop by hop and publishes snapshots.
+
+    Every ``hop_size`` new samples, ``analyze`` turns the latest
+    ``block_size`` samples (the analysis window, overlapping the previous one
+    when the hop is smaller) into a FeatureSnapshot. The newest snapshot is
+    published by swapping the ``latest`` reference, which the render loop
+    reads without locking, and optionally handed to ``publish`` (e.g. a
+    FeaturePublisher sending it to other displays).
+    """
+
+    def __init__(self, ring: AudioRingBuffer, block_size: int, sample_rate: int,
+                 analyze: Callable[..., FeatureSnapshot], hop_size: int = None,
+                 publish: Callable[[FeatureSnapshot], None] = None):
+        super().__init__(name="audio-analysis", daemon=True)
+        self.ring = ring
+        self.block_size = block_size
+        self.hop_size = hop_size or block_size
+        self.sample_rate = sample_rate
+        self.analyze = analyze
+        self.publish = publish
+        self.block = np.zeros(block_size, dtype=np.float32)
+        self.latest: Optional[FeatureSnapshot] = None
+        self.seq = 0
+        self.underruns = 0
+        self.data_ready = threading.Event()
+        self._stop_event = threading.Event()
+
+    @property
+    def block_period(self) -> float:
+        return self.hop_size / self.sample_rate
+
+    def notify(self):
+        """Called by the producer after writing samples"""
+        self.data_ready.set()
+
+    def poll(self) -> int:
+        """Analyze every complete hop currently buffered"""
+        processed = 0
+        ring = self.ring
+        while ring.read_window(self.block, self.hop_size):
+            self.seq += 1
+            # Oldest sample this analysis is the first to see: worst-case reaction time
+            captured = ring.capture_time(ring.read_pos - self.hop_size, self.sample_rate)
+            self.latest = self.analyze(self.block, self.seq, captured)
+            if self.publish is not None:
+                self.publish(self.latest)
+            processed += 1
+        return processed
+
+    def run(self):
+        # Allow a generous margin over one block period before calling it an underrun
+        timeout = self.block_period * 2
+        while not self._stop_event.is_set():
+            if not self.data_ready.wait(timeout):
+                self.underruns += 1
+                continue
+            self.data_ready.clear()
+            self.poll()
+
+    def stop(self, timeout: float = 1.0):
+        self._stop_event.set()
+        self.data_ready.set()
+        if self.is_alive():
+            self.join(timeout)
+
@@ -0,0 +1,285 @@
+"""Headless per-style frame-time benchmark driven by synthetic audio.
+
+Example:
+    python music_visualization/benchmark.py --counts 50,200,1000 --sizes 800x600,1920x1080 -o bench.json
+    python music_visualization/benchmark.py -o new.json --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+SAMPLE_RATE = 44100
+
+
+def make_signal(kind: str, seconds: float, rate: int = SAMPLE_RATE, seed: int = 0) -> np.ndarray:
+    """Synthetic test signals: silence, sweep, noise or kick"""
+    n = int(seconds * rate)
+    t = np.arange(n) / rate
+    if kind == 'silence':
+        data = np.zeros(n)
+    elif kind == 'sweep':
+        # Exponential sine sweep 40 Hz -> 16 kHz
+        f0, f1 = 40.0, 16000.0
+        k = np.log(f1 / f0)
+        data = 0.5 * np.sin(2 * np.pi * f0 * seconds / k * (np.exp(t / seconds * k) - 1))
+    elif kind == 'noise':
+        data = 0.3 * np.random.default_rng(seed).standard_normal(n)
+    elif kind == 'kick':
+        # 120 BPM kick drum: decaying pitch-swept sine every half second
+        phase_t = t % 0.5
+        freq = 50 + 100 * np.exp(-phase_t * 30)
+        data = 0.9 * np.sin(2 * np.pi * np.cumsum(freq) / rate) * np.exp(-phase_t * 12)
+    else:
+        raise ValueError(f"Unknown signal: {kind}")
+    return data.astype(np.float32)
+
+
+class SurfaceCounter:
+    """Counts pygame.Surface constructions while installed"""
+
+    def __init__(self, pygame):
+        self.pygame = pygame
+        self.original = pygame.Surface
+        self.count = 0
+        counter = self
+
+        class CountingSurface(self.original):
+            def __init__(self, *args, **kwargs):
+                counter.count += 1
+                super().__init__(*args, **kwargs)
+
+        self.surface_type = CountingSurface
+
+    def __enter__(self):
+        self.pygame.Surface = self.surface_type
+        return self
+
+    def __exit__(self, *exc):
+        self.pygame.Surface = self.original
+        return False
+
+
+def percentiles(samples) -> dict:
+    values = np.asarray(samples) * 1000.0
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'mean': float(values.mean())}
+
+
+def bench_case(style: int, signal: np.ndarray, count: int, size, frames: int,
+               warmup: int, alloc_frames: int = 10, fps: int = 60, seed: int = 0,
+               trail_mode: bool = True, render_scale: float = 1.0, raster: str = None) -> dict:
+    """Time update and draw for one style/signal/count/window-size combination.
+
+    Timing frames run untraced; allocations are measured afterwards over
+    ``alloc_frames`` extra frames with tracemalloc, which would skew timing.
+    """
+    import pygame
+    from music_visualizer import MusicVisualizer
+    from audio_pipeline import AnalysisThread
+
+    viz = MusicVisualizer(size[0], size[1], seed=seed, render_scale=render_scale, raster=raster)
+    viz.activate_style(style)
+    active = viz.style
+    setattr(active, active.limit, count)
+    viz.trail_mode = trail_mode
+    viz.started = True
+    viz.recording = True
+    viz.analysis = AnalysisThread(viz.ring, viz.block_size, SAMPLE_RATE, viz.spectrum_analyzer)
+
+    block = viz.block_size
+    fed = 0
+    update_times, draw_times, alloc_bytes, surfaces = [], [], [], []
+    counter = SurfaceCounter(pygame)
+
+    def feed(frame):
+        nonlocal fed
+        target = min(int((frame + 1) * SAMPLE_RATE / fps), len(signal))
+        while fed + block <= target:
+            viz.ring.write(signal[fed:fed + block])
+            viz.analysis.poll()
+            fed += block
+
+    def hold_count():
+        # Keep the element count at the target so the sweep measures what it says
+        if hasattr(active, 'create'):
+            deficit = count - active.element_count()
+            if deficit > 0:
+                energy = viz.analysis.latest.energy if viz.analysis.latest else 0.05
+                active.create(max(energy, 0.02), deficit)
+        elif len(active.history):
+            while len(active.history) < count:
+                active.history.push(active.history.newest())
+
+    for frame in range(warmup + frames + alloc_frames):
+        measure = warmup <= frame < warmup + frames
+        trace = frame >= warmup + frames
+        feed(frame)
+        hold_count()
+
+        if trace:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            counter.count = 0
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+
+        with counter:
+            t0 = time.perf_counter()
+            viz.consume_features()
+            viz.update_particles()
+            t1 = time.perf_counter()
+            viz.screen.fill(viz.background_color)
+            viz.draw_scene()
+            t2 = time.perf_counter()
+
+        if measure:
+            update_times.append(t1 - t0)
+            draw_times.append(t2 - t1)
+        elif trace:
+            alloc_bytes.append(tracemalloc.get_traced_memory()[1] - baseline)
+            surfaces.append(counter.count)
+    tracemalloc.stop()
+
+    totals = np.array(update_times) + np.array(draw_times)
+    return {
+        'style': style,
+        'style_name': viz.style_names[style],
+        'count': count,
+        'size': f"{size[0]}x{size[1]}",
+        'render_scale': viz.render_scale,
+        'raster': raster,
+        'frames': frames,
+        'update_ms': percentiles(update_times),
+        'draw_ms': percentiles(draw_times),
+        'total_ms': percentiles(totals),
+        'alloc_kb_per_frame': float(np.mean(alloc_bytes) / 1024) if alloc_bytes else 0.0,
+        'surfaces_per_frame': float(np.mean(surfaces)) if surfaces else 0.0,
+    }
+
+
+def run_benchmark(styles, signals, counts, sizes, frames: int = 120, warmup: int = 20,
+                  alloc_frames: int = 10, seed: int = 0, trail_mode: bool = True,
+                  render_scale: float = 1.0, raster: str = None, progress=print) -> dict:
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    seconds = (frames + warmup + alloc_frames) / 60 + 1
+    results = []
+    for kind in signals:
+        signal = make_signal(kind, seconds, seed=seed)
+        for style in styles:
+            for size in sizes:
+                for count in counts:
+                    result = bench_case(style, signal, count, size, frames, warmup,
+                                        alloc_frames, seed=seed, trail_mode=trail_mode,
+                                        render_scale=render_scale, raster=raster)
+                    result['signal'] = kind
+                    results.append(result)
+                    progress(f"{kind:8s} style {style} {result['size']:>9s} n={count:<6d} "
+                             f"update p95 {result['update_ms']['p95']:7.2f} ms  "
+                             f"draw p95 {result['draw_ms']['p95']:7.2f} ms  "
+                             f"surfaces/frame {result['surfaces_per_frame']:.1f}")
+    return {'meta': environment_info(), 'results': results}
+
+
+def environment_info() -> dict:
+    import pygame
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pygame': pygame.version.ver,
+        'machine': platform.machine(),
+    }
+
+
+def case_key(result: dict):
+    return (result['signal'], result['style'], result['size'], result['count'],
+            result.get('render_scale', 1.0), result.get('raster'))
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.2):
+    """List cases whose p95 total frame time grew by more than ``threshold``"""
+    old = {case_key(r): r for r in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        before = old.get(case_key(result))
+        if before is None:
+            continue
+        was, now = before['total_ms']['p95'], result['total_ms']['p95']
+        if was > 0 and (now - was) / was > threshold:
+            regressions.append((case_key(result), was, now))
+    return regressions
+
+
+def parse_sizes(text: str):
+    return [tuple(int(v) for v in item.lower().split('x')) for item in text.split(',')]
+
+
+def main(argv=None):
+    from styles import STYLES
+
+    parser = argparse.ArgumentParser(description="Benchmark each visual style with synthetic audio")
+    parser.add_argument('--styles', default=','.join(str(number) for number in STYLES),
+                        help="comma separated style numbers (default: every registered style)")
+    parser.add_argument('--signals', default='silence,sweep,noise,kick')
+    parser.add_argument('--counts', default='50,200,1000', help="element limits to sweep")
+    parser.add_argument('--sizes', default='800x600', help="comma separated WIDTHxHEIGHT list")
+    parser.add_argument('--frames', type=int, default=120)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--alloc-frames', type=int, default=10,
+                        help="extra frames traced for allocation counts")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--history-mode', action='store_true',
+                        help="redraw full wave/ripple history instead of trail buffers")
+    parser.add_argument('--render-scale', type=float, default=1.0,
+                        help="internal render resolution as a fraction of the window size")
+    parser.add_argument('--raster', nargs='?', const='add', choices=('add', 'alpha'),
+                        help="draw particles and stars with the NumPy rasterizer")
+    parser.add_argument('-o', '--output', default='bench_results.json')
+    parser.add_argument('--compare', help="baseline JSON to check for regressions")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="relative p95 increase counted as a regression")
+    args = parser.parse_args(argv)
+    styles = [int(s) for s in args.styles.split(',')]
+    unknown = [number for number in styles if number not in STYLES]
+    if unknown:
+        parser.error(f"unknown styles {unknown}; registered: {list(STYLES)}")
+
+    report = run_benchmark(styles,
+                           args.signals.split(','),
+                           [int(c) for c in args.counts.split(',')],
+                           parse_sizes(args.sizes),
+                           args.frames, args.warmup, args.alloc_frames, args.seed,
+                           trail_mode=not args.history_mode, render_scale=args.render_scale,
+                           raster=args.raster)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(report['results'])} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        for (signal, style, size, count, *_), was, now in regressions:
+            print(f"REGRESSION {signal} style {style} {size} n={count}: "
+                  f"p95 {was:.2f} ms -> {now:.2f} ms")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import functools
+
+import pygame
+from typing import Dict, List, Tuple
+
+
+TRANSPARENT = (0, 0, 0, 0)
+
+
+class LayerCompositor:
+    """Persistent per-style alpha layers with dirty-rect clearing.
+
+    Each style draws into its own SRCALPHA layer that lives for the whole
+    session. Elements are drawn on a shared scratch surface clipped to their
+    bounding box, blended onto the layer with an area blit, and the scratch
+    box is wiped again. Only the regions touched last frame are cleared, and
+    the layer reaches the screen with a single blit of the dirty union, so
+    frame cost follows the drawn area rather than element count x window size.
+    """
+
+    def __init__(self, size: Tuple[int, int]):
+        self.layers: Dict[object, pygame.Surface] = {}
+        self.dirty: Dict[object, List[pygame.Rect]] = {}
+        self._active = None
+        self._element_rect = None
+        self.resize(size)
+
+    def resize(self, size: Tuple[int, int]):
+        """Drop all layers and reallocate for a new target size"""
+        self.size = (int(size[0]), int(size[1]))
+        self.bounds = pygame.Rect((0, 0), self.size)
+        self.layers.clear()
+        self.dirty.clear()
+        self.scratch = pygame.Surface(self.size, pygame.SRCALPHA)
+
+    def layer(self, key) -> pygame.Surface:
+        layer = self.layers.get(key)
+        if layer is None:
+            layer = pygame.Surface(self.size, pygame.SRCALPHA)
+            self.layers[key] = layer
+            self.dirty[key] = []
+        return layer
+
+    def release(self, key):
+        """Free the layer of a style that is no longer shown"""
+        self.layers.pop(key, None)
+        self.dirty.pop(key, None)
+
+    def begin(self, key) -> pygame.Surface:
+        """Start a frame on ``key``'s layer, clearing last frame's regions"""
+        layer = self.layer(key)
+        for rect in self.dirty[key]:
+            layer.fill(TRANSPARENT, rect)
+        self.dirty[key] = []
+        self._active = key
+        return layer
+
+    def element(self, rect) -> pygame.Surface:
+        """Return the scratch surface clipped to an element's bounding box"""
+        clip = pygame.Rect(rect).clip(self.bounds)
+        self._element_rect = clip
+        self.scratch.set_clip(clip)
+        return self.scratch
+
+    def commit(self):
+        """Blend the current element onto the active layer"""
+        rect = self._element_rect
+        if rect is None or not rect.width or not rect.height:
+            return
+        self.layers[self._active].blit(self.scratch, rect, rect)
+        self.scratch.set_clip(None)
+        self.scratch.fill(TRANSPARENT, rect)
+        self.dirty[self._active].append(rect)
+        self._element_rect = None
+
+    def mark(self, rect):
+        """Record a region drawn directly onto the active layer"""
+        rect = pygame.Rect(rect).clip(self.bounds)
+        if rect.width and rect.height:
+            self.dirty[self._active].append(rect)
+
+    def end(self, target: pygame.Surface, dest=(0, 0)):
+        """Blit the active layer's drawn area onto ``target`` in one call"""
+        rects = self.dirty[self._active]
+        if rects:
+            area = rects[0].unionall(rects[1:])
+            target.blit(self.layers[self._active], (dest[0] + area.x, dest[1] + area.y), area)
+        self._active = None
+
+
+class TrailBuffer:
+    """Persistent feedback surface for fading trails.
+
+    Each frame the alpha of the whole buffer is faded with two fills
+    (multiply, then a saturating subtract so faint pixels still reach zero),
+    the newest content is drawn on top and the result is blitted once, so
+    the trail length only changes the fade factor, not the per-frame cost.
+    """
+
+    def __init__(self, size: Tuple[int, int]):
+        self.resize(size)
+
+    def resize(self, size: Tuple[int, int]):
+        self.size = (int(size[0]), int(size[1]))
+        self.surface = pygame.Surface(self.size, pygame.SRCALPHA)
+
+    def clear(self):
+        self.surface.fill(TRANSPARENT)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def fade_factor(frames: float) -> int:
+        """Alpha multiplier (out of 256) that fades full alpha to 0 over ``frames``"""
+        frames = max(1, round(frames))
+
+        def lifetime(factor):
+            # Same steps as fade(): MULT rounds (a*f+255)>>8, then the -1
+            alpha, n = 255, 0
+            while alpha:
+                alpha = max(0, ((alpha * factor + 255) >> 8) - 1)
+                n += 1
+            return n
+
+        # Lifetime grows with the factor: take the largest one gone within ``frames``
+        lo, hi = 1, 255
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if lifetime(mid) <= frames:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    def fade(self, factor: int):
+        # Only alpha fades: colours keep their hue and blend out over the
+        # background instead of darkening below it
+        self.surface.fill((255, 255, 255, factor), special_flags=pygame.BLEND_RGBA_MULT)
+        # MULT rounds (a*f+255)>>8, which leaves alpha <= 255/(256-factor)
+        # unchanged forever; a saturating -1 lets every pixel reach zero
+        self.surface.fill((0, 0, 0, 1), special_flags=pygame.BLEND_RGBA_SUB)
+
+    def draw(self, target: pygame.Surface, dest=(0, 0)):
+        target.blit(self.surface, dest)
@@ -0,0 +1,369 @@
+"""Feature frames over UDP or Unix datagram sockets: one analyser, many displays.
+
+A publisher sends one small packet per analysis hop: a fixed header (magic,
+protocol version, flags, publisher session, sequence number, timestamp,
+energy, beat counters, tempo and the stream's hop/window sizes) followed by the
+bands as float16, about 250 bytes for 100 bands. The spectrum is not sent;
+no style reads it. Subscribers keep only the newest frame, the same way
+AnalysisThread publishes ``latest``. Late and duplicate packets (sequence at
+or below the newest one) are dropped; gaps they do not fill count as lost. The
+running beat total is carried in every packet, so beats in lost packets
+still burst on the next one that arrives.
+
+Addresses are ``HOST:PORT`` for UDP (a multicast group such as
+239.255.42.1 reaches every display on the LAN) or ``unix:/path`` for a
+Unix datagram socket on the same machine.
+
+Example:
+    python music_visualization/feature_broadcast.py publish 239.255.42.1:5005
+    python music_visualization/music_visualizer.py --subscribe 239.255.42.1:5005 --style 3
+    python music_visualization/feature_broadcast.py publish 127.0.0.1:5005 --test-signal kick --loss 0.1
+    python music_visualization/feature_broadcast.py listen 127.0.0.1:5005
+"""
+import argparse
+import ipaddress
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+
+from audio_pipeline import FeatureSnapshot
+
+MAGIC = b'MoSF'
+PROTOCOL_VERSION = 1
+# magic, version, flags, band count, session, seq, timestamp, energy,
+# confidence, tempo, beats, sample rate, window size, hop size
+HEADER = struct.Struct('<4sBBHIQdfffIIHH')
+FLAG_ONSET = 1
+FLAG_BEAT = 2
+
+
+def parse_address(text: str):
+    """``unix:/path`` or ``HOST:PORT`` -> (socket family, address)"""
+    if text.startswith('unix:'):
+        return socket.AF_UNIX, text[len('unix:'):]
+    host, _, port = text.rpartition(':')
+    if not host or not port.isdigit():
+        raise ValueError(f"Expected HOST:PORT or unix:/path, got {text!r}")
+    return socket.AF_INET, (host, int(port))
+
+
+def is_multicast(host: str) -> bool:
+    try:
+        return ipaddress.ip_address(host).is_multicast
+    except ValueError:
+        return False  # A host name
+
+
+class FeaturePublisher:
+    """Sends every snapshot it is given to one or more addresses.
+
+    ``publish`` is called on the analysis thread once per hop; sockets are
+    non-blocking, so a full send buffer drops the packet instead of stalling
+    analysis. ``loss`` and ``reorder`` randomly drop packets or swap
+    neighbours, to exercise subscribers over loopback.
+    """
+
+    def __init__(self, targets, sample_rate: int, block_size: int, hop_size: int, n_bands: int,
+                 loss: float = 0.0, reorder: float = 0.0, ttl: int = 1):
+        if isinstance(targets, str):
+            targets = targets.split(',')
+        self.targets = [parse_address(target) for target in targets]
+        self.stream_info = (sample_rate, block_size, hop_size)
+        self.n_bands = n_bands
+        # Subscribers tell a restarted publisher apart by its session id
+        self.session = int.from_bytes(os.urandom(4), 'little')
+        self.loss = loss
+        self.reorder = reorder
+        self.rng = np.random.default_rng()
+        self.sent = 0
+        self.send_errors = 0
+        self.simulated_drops = 0
+        self._held = None
+        self._sockets = {}
+        for family, address in self.targets:
+            if family not in self._sockets:
+                sock = socket.socket(family, socket.SOCK_DGRAM)
+                if family == socket.AF_INET:
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+                    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+                sock.setblocking(False)
+                self._sockets[family] = sock
+        # Packed in place: header, then the bands as float16
+        self._packet = bytearray(HEADER.size + 2 * n_bands)
+        self._bands = np.frombuffer(self._packet, dtype='<f2', offset=HEADER.size)
+
+    def encode(self, snapshot: FeatureSnapshot) -> bytes:
+        flags = (FLAG_ONSET if snapshot.onset else 0) | (FLAG_BEAT if snapshot.beat else 0)
+        HEADER.pack_into(self._packet, 0, MAGIC, PROTOCOL_VERSION, flags, self.n_bands,
+                         self.session, snapshot.seq, snapshot.timestamp, snapshot.energy,
+                         snapshot.confidence, snapshot.tempo, snapshot.beats, *self.stream_info)
+        self._bands[:] = snapshot.bands
+        return bytes(self._packet)
+
+    def publish(self, snapshot: FeatureSnapshot):
+        packet = self.encode(snapshot)
+        if self.loss and self.rng.random() < self.loss:
+            self.simulated_drops += 1
+            return
+        if self.reorder and self._held is None and self.rng.random() < self.reorder:
+            self._held = packet  # Sent after the next packet
+            return
+        self._send(packet)
+        if self._held is not None:
+            self._send(self._held)
+            self._held = None
+
+    def _send(self, packet: bytes):
+        for family, address in self.targets:
+            try:
+                self._sockets[family].sendto(packet, address)
+                self.sent += 1
+            except OSError:
+                # Buffer full, or no subscriber bound to a Unix path yet
+                self.send_errors += 1
+
+    def stats(self) -> dict:
+        return {
+            'sent': self.sent,
+            'send_errors': self.send_errors,
+            'simulated_drops': self.simulated_drops,
+        }
+
+    def close(self):
+        for sock in self._sockets.values():
+            sock.close()
+        self._sockets = {}
+
+
+class FeatureSubscriber(threading.Thread):
+    """Receives feature frames in place of local capture and analysis.
+
+    Mirrors AnalysisThread's interface (``latest``, ``underruns``, ``stop``).
+    Snapshots are renumbered locally, so sequence numbers and beat totals
+    keep rising across a publisher restart. Bands are resampled when the
+    publisher uses a different band count than the display.
+    """
+
+    def __init__(self, address: str, n_bands: int = 100, timeout: float = 0.5):
+        super().__init__(name="feature-subscriber", daemon=True)
+        self.address = address
+        self.n_bands = n_bands
+        self.timeout = timeout
+        self.latest = None
+        self.received = 0
+        self.skipped = 0  # Sequence numbers jumped over: lost, or arriving late
+        self.late = 0  # Reordered or duplicate packets, dropped
+        self.invalid = 0
+        self.underruns = 0  # Timeouts without any packet
+        self.restarts = 0
+        self.sample_rate = self.block_size = self.hop_size = None
+        self.seq = 0
+        self.beats = 0
+        self._session = None
+        self._last_remote = 0
+        self._seq_offset = 0
+        self._beats_offset = 0
+        self._stop_event = threading.Event()
+        self.family, self.bind_address = parse_address(address)
+        self.sock = self._open()
+
+    def _open(self):
+        sock = socket.socket(self.family, socket.SOCK_DGRAM)
+        if self.family == socket.AF_UNIX:
+            if os.path.exists(self.bind_address):
+                os.unlink(self.bind_address)  # Left behind by an earlier run
+            sock.bind(self.bind_address)
+        else:
+            host, port = self.bind_address
+            # Several displays on one machine can share a multicast group
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if is_multicast(host):
+                sock.bind(('', port))
+                membership = struct.pack('4s4s', socket.inet_aton(host), socket.inet_aton('0.0.0.0'))
+                sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+            else:
+                sock.bind((host, port))
+        sock.settimeout(self.timeout)
+        return sock
+
+    def receive(self, data: bytes) -> bool:
+        """Decode one packet; returns True if it became ``latest``"""
+        if len(data) < HEADER.size:
+            self.invalid += 1
+            return False
+        (magic, version, flags, n_bands, session, seq, timestamp, energy, confidence, tempo,
+         beats, sample_rate, block_size, hop_size) = HEADER.unpack_from(data)
+        if magic != MAGIC or version != PROTOCOL_VERSION or len(data) != HEADER.size + 2 * n_bands:
+            self.invalid += 1
+            return False
+        self.received += 1
+        if session != self._session:
+            if self._session is not None:
+                self.restarts += 1
+            self._session = session
+            # Continue the local numbering from where the previous publisher left off
+            self._last_remote = seq - 1
+            self._seq_offset = self.seq - self._last_remote
+            self._beats_offset = self.beats - beats
+        if seq <= self._last_remote:
+            self.late += 1
+            return False
+        self.skipped += seq - self._last_remote - 1
+        self._last_remote = seq
+
+        bands = np.frombuffer(data, dtype='<f2', count=n_bands, offset=HEADER.size).astype(np.float32)
+        if n_bands != self.n_bands:
+            bands = np.interp(np.linspace(0, n_bands - 1, self.n_bands),
+                              np.arange(n_bands), bands).astype(np.float32)
+        bands.flags.writeable = False
+        self.sample_rate, self.block_size, self.hop_size = sample_rate, block_size, hop_size
+        self.seq = seq + self._seq_offset
+        self.beats = beats + self._beats_offset
+        # capture_time stays 0: the publisher's clock means nothing here
+        self.latest = FeatureSnapshot(self.seq, timestamp, energy, None, bands,
+                                      bool(flags & FLAG_ONSET), bool(flags & FLAG_BEAT),
+                                      self.beats, confidence, tempo)
+        return True
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                data = self.sock.recv(65536)
+            except socket.timeout:
+                self.underruns += 1
+                continue
+            except OSError:
+                break  # Closed by stop()
+            self.receive(data)
+
+    @property
+    def lost(self) -> int:
+        return max(0, self.skipped - self.late)
+
+    def stats(self) -> dict:
+        lost = self.lost
+        total = self.received + lost
+        return {
+            'received': self.received,
+            'lost': lost,
+            'late': self.late,
+            'invalid': self.invalid,
+            'loss_rate': round(lost / total, 4) if total else 0.0,
+            'publisher_restarts': self.restarts,
+        }
+
+    def stop(self, timeout: float = 1.0):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout + self.timeout)
+        self.sock.close()
+        if self.family == socket.AF_UNIX and os.path.exists(self.bind_address):
+            os.unlink(self.bind_address)
+
+
+def publish(args):
+    """Headless publisher: capture (or a test signal), analyse, send"""
+    from audio_pipeline import AnalysisThread, AudioRingBuffer, capture_time
+    from spectrum import SpectrumAnalyzer
+
+    sample_rate, block_size = 44100, 2048
+    hop_size = args.hop_size or block_size
+    analyzer = SpectrumAnalyzer(block_size, sample_rate, n_bands=args.bands, hop_size=hop_size)
+    publisher = FeaturePublisher(args.address, sample_rate, block_size, hop_size, args.bands,
+                                 loss=args.loss, reorder=args.reorder, ttl=args.ttl)
+    ring = AudioRingBuffer(block_size * 16)
+    analysis = AnalysisThread(ring, block_size, sample_rate, analyzer, hop_size=hop_size,
+                              publish=publisher.publish)
+    analysis.start()
+    stream = None
+    try:
+        if args.test_signal:
+            from benchmark import make_signal
+            # Loopback source: a synthetic signal played at real-time pace
+            signal = make_signal(args.test_signal, 8.0, sample_rate)
+            position = 0
+            next_time = time.perf_counter()
+            print(f"发布测试信号 '{args.test_signal}' -> {args.address}")
+            while args.seconds is None or position < args.seconds * sample_rate:
+                offset = position % (len(signal) - hop_size)
+                ring.write(signal[offset:offset + hop_size], time.perf_counter())
+                analysis.notify()
+                position += hop_size
+                next_time += hop_size / sample_rate
+                time.sleep(max(0.0, next_time - time.perf_counter()))
+        else:
+            import sounddevice as sd
+
+            def callback(indata, frames, time_info, status):
+                ring.write(indata[:, 0], capture_time(time_info, frames, sample_rate))
+                analysis.notify()
+
+            stream = sd.InputStream(callback=callback, channels=1, samplerate=sample_rate,
+                                    blocksize=hop_size)
+            stream.start()
+            print(f"发布音频特征 -> {args.address} (Ctrl+C 停止)")
+            started = time.perf_counter()
+            while args.seconds is None or time.perf_counter() - started < args.seconds:
+                time.sleep(0.1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if stream is not None:
+            stream.stop()
+            stream.close()
+        analysis.stop()
+        publisher.close()
+    print(f"发布统计: {publisher.stats()}")
+
+
+def listen(args):
+    """Headless subscriber: print what arrives"""
+    subscriber = FeatureSubscriber(args.address, args.bands)
+    subscriber.start()
+    started = time.perf_counter()
+    try:
+        while args.seconds is None or time.perf_counter() - started < args.seconds:
+            time.sleep(1.0)
+            snapshot = subscriber.latest
+            if snapshot is not None:
+                print(f"seq {snapshot.seq} energy {snapshot.energy:.3f} beats {snapshot.beats} "
+                      f"tempo {snapshot.tempo:.0f} | {subscriber.stats()}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        subscriber.stop()
+    print(f"接收统计: {subscriber.stats()}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish or receive audio features over the network")
+    commands = parser.add_subparsers(dest='command', required=True)
+    pub = commands.add_parser('publish', help="capture and analyse audio, send feature frames")
+    pub.add_argument('address', help="HOST:PORT (unicast, broadcast or multicast) or unix:/path; "
+                                     "comma-separate several")
+    pub.add_argument('--test-signal', choices=('silence', 'sweep', 'noise', 'kick'),
+                     help="send a synthetic signal instead of capturing from the microphone")
+    pub.add_argument('--hop-size', type=int, help="samples between frames (default: the 2048 window)")
+    pub.add_argument('--loss', type=float, default=0.0, help="randomly drop this fraction of packets")
+    pub.add_argument('--reorder', type=float, default=0.0, help="randomly swap this fraction of packets")
+    pub.add_argument('--ttl', type=int, default=1, help="multicast hops")
+    sub = commands.add_parser('listen', help="receive feature frames and print them")
+    sub.add_argument('address', help="HOST:PORT to bind (or a multicast group) or unix:/path")
+    for command in (pub, sub):
+        command.add_argument('--bands', type=int, default=100)
+        command.add_argument('--seconds', type=float, default=None, help="stop after this long")
+    args = parser.parse_args(argv)
+    if args.command == 'publish':
+        publish(args)
+    else:
+        listen(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
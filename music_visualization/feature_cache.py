@@ -0,0 +1,291 @@
+"""Disk cache of per-block audio features for pre-recorded tracks.
+
+A track is analysed once, block by block, with the same ring buffer and
+SpectrumAnalyzer as live capture. Each feature becomes one ``.npy`` file with
+a row per block, written through ``open_memmap`` so memory stays flat however
+long the track is. Entries are keyed by a hash of the file's bytes and the
+analysis parameters. The hash is remembered per path, size and mtime, so a
+warm start only stats the file. Playback maps the tracks back with
+``np.load(mmap_mode='r')``, so a cached track starts without decoding audio
+or running any FFTs.
+
+Example:
+    python music_visualization/feature_cache.py song.wav
+    python music_visualization/offline_render.py song.wav --out-dir frames
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from typing import Tuple
+
+import numpy as np
+
+from audio_pipeline import AudioRingBuffer, FeatureSnapshot
+
+# Bump when the analysis changes so older entries are recomputed
+CACHE_VERSION = 2
+
+# Per-block feature tracks: name -> (dtype, row shape as a function of n_bands, n_bins)
+TRACKS = {
+    'energy': ('<f4', lambda n_bands, n_bins: ()),
+    'bands': ('<f4', lambda n_bands, n_bins: (n_bands,)),
+    'spectrum': ('<f4', lambda n_bands, n_bins: (n_bins,)),
+    'onset': ('|b1', lambda n_bands, n_bins: ()),
+    'beat': ('|b1', lambda n_bands, n_bins: ()),
+    'beats': ('<i4', lambda n_bands, n_bins: ()),
+    'confidence': ('<f4', lambda n_bands, n_bins: ()),
+    'tempo': ('<f4', lambda n_bands, n_bins: ()),
+}
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'master-of-sound', 'features')
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-1 of a file's bytes, read in chunks"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(digest: str, params: dict) -> str:
+    text = json.dumps({'content': digest, 'version': CACHE_VERSION, **params}, sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()[:24]
+
+
+class FeatureTrack:
+    """Memory-mapped feature tracks of one analysed file (one row per block)"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json')) as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != CACHE_VERSION:
+            raise ValueError(f"cache version {self.meta.get('version')} != {CACHE_VERSION}")
+        self.tracks = {name: np.load(os.path.join(directory, name + '.npy'), mmap_mode='r')
+                       for name in TRACKS}
+        self.blocks = self.meta['blocks']
+        if any(len(track) != self.blocks for track in self.tracks.values()):
+            raise ValueError("truncated feature track")
+        self.sample_rate = self.meta['sample_rate']
+        self.block_size = self.meta['block_size']
+        self.hop_size = self.meta['hop_size']
+
+    def __len__(self):
+        return self.blocks
+
+    @property
+    def duration(self) -> float:
+        return self.meta['samples'] / self.sample_rate
+
+    def snapshot(self, seq: int) -> FeatureSnapshot:
+        """Features of block ``seq`` (1-based, like live sequence numbers)"""
+        t = self.tracks
+        i = seq - 1
+        # Rows of a read-only memmap: nothing is copied until a style reads them
+        return FeatureSnapshot(seq, i * self.hop_size / self.sample_rate, float(t['energy'][i]),
+                               t['spectrum'][i], t['bands'][i], bool(t['onset'][i]),
+                               bool(t['beat'][i]), int(t['beats'][i]),
+                               float(t['confidence'][i]), float(t['tempo'][i]))
+
+
+class TrackPlayback:
+    """Replays a FeatureTrack in place of AnalysisThread (``latest`` and ``seq``)"""
+
+    def __init__(self, track: FeatureTrack):
+        self.track = track
+        self.latest = None
+        self.seq = 0
+        self.underruns = 0
+
+    def advance(self, samples: int) -> int:
+        """Publish every block completed by ``samples`` samples of playback"""
+        target = min(len(self.track), samples // self.track.hop_size)
+        processed = max(0, target - self.seq)
+        if processed:
+            self.seq = target
+            self.latest = self.track.snapshot(target)
+        return processed
+
+
+class FeatureCache:
+    """Directory of FeatureTracks keyed by content hash and analysis parameters"""
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or default_cache_dir()
+
+    def entry(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.directory, 'index.json')
+
+    def content_digest(self, audio_path: str) -> Tuple[str, bool]:
+        """Hash of ``audio_path``'s bytes and whether the file had to be read
+
+        The hash is reused while the file's size and mtime are unchanged.
+        """
+        path = os.path.abspath(audio_path)
+        st = os.stat(path)
+        stamp = [st.st_size, st.st_mtime_ns]
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        entry = index.get(path)
+        if isinstance(entry, list) and entry[:2] == stamp:
+            return entry[2], False
+        digest = file_digest(path)
+        index[path] = stamp + [digest]
+        # Replaced atomically; a lost race only means one more hash later
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = f"{self.index_path}.tmp{os.getpid()}"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(index, f)
+            os.replace(tmp, self.index_path)
+        except OSError:
+            pass
+        return digest, True
+
+    def load(self, key: str):
+        """The cached FeatureTrack for ``key``, or None; broken entries are removed"""
+        path = self.entry(key)
+        if not os.path.isdir(path):
+            return None
+        try:
+            return FeatureTrack(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"特征缓存失效 ({e}), 重新分析: {path}")
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+
+    def get(self, audio_path: str, block_size: int = 2048, hop_size: int = None,
+            n_bands: int = 100, sample_rate: int = None, load_audio=None) -> FeatureTrack:
+        """Load the features of ``audio_path``, analysing and storing them on a miss
+
+        ``sample_rate`` resamples before analysis; None keeps the file's own rate.
+        """
+        hop_size = hop_size or block_size
+        params = {'block_size': block_size, 'hop_size': hop_size, 'n_bands': n_bands,
+                  'sample_rate': sample_rate}
+        digest, hashed = self.content_digest(audio_path)
+        key = cache_key(digest, params)
+        track = self.load(key)
+        if track is None:
+            if load_audio is None:
+                from offline_render import load_audio
+            samples, rate = load_audio(audio_path, sample_rate)
+            track = self.store(key, audio_path, digest, samples, rate, block_size, hop_size, n_bands)
+        if hashed:
+            # New or changed file: drop entries of its old contents, also when
+            # the new contents were already cached
+            self.prune_stale(key, os.path.abspath(audio_path), digest)
+        return track
+
+    def store(self, key: str, audio_path: str, digest: str, samples: np.ndarray, sample_rate: int,
+              block_size: int, hop_size: int, n_bands: int) -> FeatureTrack:
+        """Analyse ``samples`` at ``sample_rate`` block by block and write the tracks for ``key``"""
+        from spectrum import SpectrumAnalyzer
+
+        analyzer = SpectrumAnalyzer(block_size, sample_rate, n_bands=n_bands, hop_size=hop_size)
+        n_bins = block_size // 2 + 1
+        blocks = len(samples) // hop_size
+        os.makedirs(self.directory, exist_ok=True)
+        # Written under a temporary name and renamed, so readers never see half an entry
+        tmp = self.entry(f"{key}.tmp{os.getpid()}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        start = time.perf_counter()
+        try:
+            tracks = {name: np.lib.format.open_memmap(os.path.join(tmp, name + '.npy'), mode='w+',
+                                                      dtype=dtype,
+                                                      shape=(blocks, *shape(n_bands, n_bins)))
+                      for name, (dtype, shape) in TRACKS.items()}
+            # Same windows as live capture: the ring zero-fills before the first sample
+            ring = AudioRingBuffer(block_size * 16)
+            block = np.zeros(block_size, dtype=np.float32)
+            onsets = analyzer.onsets
+            i = 0
+            for pos in range(0, blocks * hop_size, hop_size):
+                ring.write(samples[pos:pos + hop_size])
+                while ring.read_window(block, hop_size):
+                    energy, magnitude, bands = analyzer.process(block)
+                    tracks['energy'][i] = energy
+                    tracks['bands'][i] = bands
+                    tracks['spectrum'][i] = magnitude
+                    tracks['onset'][i] = onsets.onset
+                    tracks['beat'][i] = onsets.beat
+                    tracks['beats'][i] = onsets.beats
+                    tracks['confidence'][i] = onsets.confidence
+                    tracks['tempo'][i] = onsets.tempo
+                    i += 1
+            for track in tracks.values():
+                track.flush()
+            del tracks
+            meta = {'version': CACHE_VERSION, 'source': os.path.abspath(audio_path), 'content': digest,
+                    'sample_rate': sample_rate, 'samples': len(samples), 'blocks': blocks,
+                    'block_size': block_size, 'hop_size': hop_size, 'n_bands': n_bands,
+                    'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'analysis_seconds': time.perf_counter() - start}
+            with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+                json.dump(meta, f, indent=2)
+            path = self.entry(key)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp, path)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        return FeatureTrack(path)
+
+    def prune_stale(self, key: str, source: str, content: str) -> int:
+        """Remove entries of an older version or of the same file before it changed"""
+        removed = 0
+        for name in os.listdir(self.directory):
+            path = self.entry(name)
+            if name == key or '.tmp' in name or not os.path.isdir(path):
+                continue
+            try:
+                with open(os.path.join(path, 'meta.json')) as f:
+                    other = json.load(f)
+            except (OSError, ValueError):
+                continue
+            outdated = other.get('version') != CACHE_VERSION
+            if outdated or (other.get('source') == source and other.get('content') != content):
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        return removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute cached audio features for files")
+    parser.add_argument('audio', nargs='+', help="audio files (WAV natively, other formats via librosa)")
+    parser.add_argument('--cache-dir', help=f"cache location (default {default_cache_dir()})")
+    parser.add_argument('--block-size', type=int, default=2048)
+    parser.add_argument('--hop-size', type=int, default=None)
+    parser.add_argument('--bands', type=int, default=100)
+    parser.add_argument('--sample-rate', type=int, default=None,
+                        help="resample to this rate before analysis (default: the file's own rate)")
+    args = parser.parse_args(argv)
+
+    cache = FeatureCache(args.cache_dir)
+    for path in args.audio:
+        start = time.perf_counter()
+        track = cache.get(path, args.block_size, args.hop_size, args.bands, args.sample_rate)
+        print(f"{path}: {len(track)} blocks, {track.duration:.1f}s of audio, "
+              f"{time.perf_counter() - start:.2f}s -> {track.directory}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+import csv
+import json
+import os
+import time
+from collections import deque
+from contextlib import nullcontext
+
+import pygame
+
+_NULL_PHASE = nullcontext()
+
+
+class _Phase:
+    """Reusable timer context for one named phase"""
+
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        current = self.profiler.current
+        current[self.name] = current.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+
+class FrameProfiler:
+    """Optional hot-path timers, audio callback load, HUD and rolling log.
+
+    When disabled, ``phase()`` returns a shared no-op context and the other
+    hooks return immediately, so leaving the calls in the main loop costs a
+    method call per site. Each finished frame is kept in a bounded history
+    for the HUD and optionally appended to a CSV (or JSON lines) log that is
+    rotated once it grows past ``log_max_bytes``.
+    """
+
+    def __init__(self, enabled: bool = False, history: int = 300, log_path: str = None,
+                 log_max_bytes: int = 5 * 1024 * 1024):
+        self.enabled = enabled
+        self.show_hud = enabled
+        self.frames = deque(maxlen=history)
+        self.current = {}
+        self.counts = {}
+        self.callback_loads = deque(maxlen=history)
+        self.log_path = log_path
+        self.log_max_bytes = log_max_bytes
+        self._phases = {}
+        self._frame_start = 0.0
+        self._log_file = None
+        self._log_writer = None
+        self._log_fields = None
+        self._font = None
+
+    def toggle_hud(self):
+        """Show/hide the HUD; enables timing the first time it is shown"""
+        self.show_hud = not self.show_hud
+        if self.show_hud:
+            self.enabled = True
+
+    def phase(self, name: str):
+        if not self.enabled:
+            return _NULL_PHASE
+        timer = self._phases.get(name)
+        if timer is None:
+            timer = self._phases[name] = _Phase(self, name)
+        return timer
+
+    def begin_frame(self):
+        if self.enabled:
+            self.current = {}
+            self._frame_start = time.perf_counter()
+
+    def end_frame(self, counts: dict = None):
+        if not self.enabled:
+            return
+        self.current['frame'] = time.perf_counter() - self._frame_start
+        self.frames.append(self.current)
+        if counts is not None:
+            self.counts = counts
+        if self.log_path:
+            self._log(self.current)
+
+    # Audio thread hooks
+
+    def callback_start(self) -> float:
+        return time.perf_counter() if self.enabled else 0.0
+
+    def callback_end(self, start: float, frames: int, sample_rate: int):
+        """Record callback time as a fraction of the block period"""
+        if not self.enabled:
+            return
+        self.callback_loads.append((time.perf_counter() - start) * sample_rate / frames)
+
+    # Reporting
+
+    def summary(self, last: int = 60) -> dict:
+        """Mean milliseconds per phase over the last ``last`` frames"""
+        frames = list(self.frames)[-last:]
+        totals = {}
+        for frame in frames:
+            for name, value in frame.items():
+                totals[name] = totals.get(name, 0.0) + value
+        phases = {name: value * 1000 / len(frames) for name, value in totals.items()} if frames else {}
+        loads = list(self.callback_loads)[-last:]
+        return {
+            'phases_ms': phases,
+            'fps': 1000 / phases['frame'] if phases.get('frame') else 0.0,
+            'callback_load_mean': sum(loads) / len(loads) if loads else 0.0,
+            'callback_load_max': max(loads) if loads else 0.0,
+            'counts': dict(self.counts),
+        }
+
+    def draw_hud(self, surface: pygame.Surface, extra: dict = None):
+        if not self.show_hud:
+            return
+        if self._font is None:
+            self._font = pygame.font.Font(None, 20)
+        info = self.summary()
+        lines = [f"frame {info['phases_ms'].get('frame', 0.0):6.2f} ms  ({info['fps']:.0f} fps of work)"]
+        for name, value in sorted(info['phases_ms'].items()):
+            if name != 'frame':
+                lines.append(f"  {name:<18s}{value:6.2f} ms")
+        lines.append(f"callback load {info['callback_load_mean'] * 100:5.1f}% avg "
+                     f"{info['callback_load_max'] * 100:5.1f}% max")
+        if info['counts']:
+            lines.append("elements " + ", ".join(f"{k}={v}" for k, v in info['counts'].items()))
+        for key, value in (extra or {}).items():
+            lines.append(f"{key} {value}")
+
+        y = 8
+        for line in lines:
+            text = self._font.render(line, True, (220, 220, 220))
+            backdrop = pygame.Rect(6, y - 1, text.get_width() + 4, text.get_height() + 2)
+            surface.fill((0, 0, 0), backdrop)
+            surface.blit(text, (8, y))
+            y += text.get_height() + 2
+
+    # Rolling log
+
+    def _log(self, frame: dict):
+        row = {'time': time.time(), **{k: round(v * 1000, 3) for k, v in frame.items()}, **self.counts}
+        if self.log_path.endswith(('.json', '.jsonl')):
+            if self._log_file is None:
+                self._log_file = open(self.log_path, 'a')
+            self._log_file.write(json.dumps(row) + '\n')
+        else:
+            fields = sorted(row)
+            if self._log_writer is None or fields != self._log_fields:
+                # (Re)open when the set of phases changes so every block has a header
+                self._close_log()
+                self._log_file = open(self.log_path, 'a', newline='')
+                self._log_fields = fields
+                self._log_writer = csv.DictWriter(self._log_file, fieldnames=fields)
+                self._log_writer.writeheader()
+            self._log_writer.writerow(row)
+        if self._log_file.tell() > self.log_max_bytes:
+            self._close_log()
+            os.replace(self.log_path, self.log_path + '.1')
+
+    def _close_log(self):
+        if self._log_file is not None:
+            self._log_file.close()
+        self._log_file = None
+        self._log_writer = None
+
+    def close(self):
+        self._close_log()
@@ -1,92 +1,188 @@
-import sounddevice as sd
+import time
+
+# Launch reference for time-to-first-frame, taken before the heavy imports
+LAUNCH_TIME = time.perf_counter()
+
+import math
+import threading
+from collections import OrderedDict, deque
+
 import numpy as np
 import pygame
-import librosa
-from typing import List, Tuple
-import colorsys
-import math
-import time
+
+from audio_pipeline import AnalysisThread, AudioRingBuffer, capture_time
+from compositor import LayerCompositor, TrailBuffer
+from raster import Rasterizer
+from recorder import FrameRecorder
+from instrumentation import FrameProfiler
+from quality import QualityGovernor
+from ui_cache import UICache
+from spectrum import SpectrumAnalyzer
+from styles import STYLES
+
+_sd = None
+
+# Spectrum bands drawn by Wave Lines (and sent to render nodes)
+N_BANDS = 100
+
+
+def sounddevice():
+    """Import sounddevice (and PortAudio) on first use"""
+    global _sd
+    if _sd is None:
+        import sounddevice as sd
+        _sd = sd
+    return _sd
+
 
 class MusicVisualizer:
-    def __init__(self, width: int = 800, height: int = 600):
-        # Initialize pygame
-        pygame.init()
-        self.width = width
-        self.height = height
-        self.screen = pygame.display.set_mode((width, height))
+    def __init__(self, width: int = 800, height: int = 600, seed: int = None,
+                 profile: bool = False, profile_log: str = None, target_fps: int = 60,
+                 analysis_process: bool = False, render_scale: float = 1.0,
+                 fullscreen: bool = False, hop_size: int = None, device_block_size: int = None,
+                 latency=None, raster: str = None, record: str = None,
+                 record_policy: str = 'drop', record_buffers: int = 8, publish: str = None,
+                 subscribe: str = None, style: int = 1, sample_rate: int = 44100,
+                 block_size: int = 2048):
+        # Initialize only the pygame modules we use (skips mixer, joystick, ...)
+        pygame.display.init()
+        pygame.font.init()
+        self.windowed_size = (width, height)
+        self.fullscreen = fullscreen
+        if fullscreen:
+            self.screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+        else:
+            self.screen = pygame.display.set_mode((width, height), pygame.RESIZABLE)
+        self.width, self.height = self.screen.get_size()
         pygame.display.set_caption("Multi-style Music Visualizer")
         
-        # Audio settings
-        self.sample_rate = 44100
-        self.block_size = 2048
+        # Hot-path timers and HUD (F3); near free while disabled
+        self.profiler = FrameProfiler(enabled=profile, log_path=profile_log)
+        
+        # Styles draw into an offscreen canvas at render_scale x the window
+        # size, upscaled to the display; simulation and UI stay native
+        self.render_scale = 1.0
+        self.smooth_upscale = True
+        self.canvas = self.screen
+        
+        # One persistent alpha layer per style, drawn via bounding boxes
+        self.compositor = LayerCompositor((self.width, self.height))
+        # Vectorized NumPy rasterizer for Styles 1 and 3 ('add' or 'alpha'
+        # blending); B toggles it against the per-element pygame.draw path
+        self.raster_mode = raster is not None
+        self.raster = Rasterizer((self.width, self.height), raster or 'add')
+        
+        # Audio settings: features are computed every hop_size samples over a
+        # block_size window; the device delivers device_block_size frames
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.hop_size = hop_size or self.block_size
+        self.device_block_size = device_block_size or self.hop_size
+        self.latency = latency  # sounddevice latency: 'low', 'high' or seconds (None = default)
+        self.input_latency = 0.0
         self.channels = 1
         
         # Visualization settings
-        self.current_style = 1  # Default to pulse style
-        self.style_names = {
-            1: "Pulse Particles",
-            2: "Wave Lines",
-            3: "Star Field",
-            4: "Geometric Shapes",
-            5: "Fluid Ripples"
-        }
-        
-        # Particle settings (Style 1)
-        self.particles = []
-        self.max_particles = 150
-        self.pulse_radius = 50
-        self.pulse_speed = 2
-        
-        # Wave settings (Style 2)
-        self.wave_points = []
-        self.wave_history = []
-        self.max_wave_history = 50
-        
-        # Star settings (Style 3)
-        self.stars = []
-        self.max_stars = 200
-        
-        # Geometric settings (Style 4)
-        self.shapes = []
-        self.max_shapes = 10
-        self.rotation = 0
-        
-        # Fluid settings (Style 5)
-        self.ripples = []
-        self.max_ripples = 20
-        self.fluid_time = 0
+        self.background_color = (15, 15, 35)
+        self.style_names = STYLES.names()
+        # Only the active style spawns, updates and draws; a few recently used
+        # ones stay suspended (frozen) and older ones are released
+        self.styles = {}
+        self.style = None
+        self.suspended = OrderedDict()
+        self.max_suspended = 2
+        
+        # Shared random generator for vectorized spawning (seeded for repeatable renders)
+        self.rng = np.random.default_rng(seed)
+        
+        # Trail rendering (Styles 2 and 5): fade a feedback buffer instead of
+        # redrawing history; T toggles back to full history redraw
+        self.trail_mode = True
+        self.trails = {}
+        
+        # Elements spawned per analysed audio block (scaled by quality)
+        self.spawn_per_block = 1
+        self._spawn_credit = 0.0
+        self.last_beats = 0
+        self.tempo = 0.0
+        self.beat_confidence = 0.0
+        
+        self.target_fps = target_fps
+        self.governor = QualityGovernor(target_fps)
         
         # Audio analysis settings
-        self.energy_history = []
         self.max_history = 50
+        self.energy_history = deque(maxlen=self.max_history)
+        
+        # Audio thread only copies into the ring; analysis runs on its own thread
+        self.ring = AudioRingBuffer(self.block_size * 16)
+        self.mix_buffer = np.zeros(self.block_size * 4, dtype=np.float32)
+        self.spectrum_analyzer = SpectrumAnalyzer(self.block_size, self.sample_rate, n_bands=N_BANDS,
+                                                  hop_size=self.hop_size)
+        self.analysis = None
+        self.last_seq = 0
+        self.status_counts = {}
+        # Capture-to-flip latency of the newest features drawn
+        self.pending_capture = 0.0
+        self.latencies = deque(maxlen=300)
+        # Optionally capture and analyse in a separate process (shared memory)
+        self.analysis_process = analysis_process
+        self.process_analysis = None
+        # Feature broadcast: send our snapshots to other displays (publish), or
+        # render frames received from a publisher instead of capturing (subscribe)
+        self.publish_address = publish
+        self.subscribe_address = subscribe
+        self.publisher = None
+        self.subscriber = None
+        self.subscriber_stats = {}  # Kept for the exit summary once it is closed
+        self.audio_ready = False
+        self.stream = None
+        self.stream_error = None
+        self.audio_opener = None
+        self.time_to_first_frame = None
         self.started = False  # Whether the start button has been clicked
         self.recording = False
         self.countdown = 3  # Countdown seconds before recording
         
+        # Capture of the displayed frames (R): PNG directory or raw RGB24 file,
+        # written by a background thread from a pool of preallocated buffers
+        self.record_path = record
+        self.record_policy = record_policy
+        self.record_buffers = record_buffers
+        self.recorder = None
+        self.finishing = []  # Stopped recordings whose writer is still busy
+        
         # Button settings
         self.start_button_radius = 40
-        self.start_button_center = (width // 2, height // 2 - 20)
         self.button_color = (255, 59, 48)  # Apple red
         self.button_hover_color = (255, 89, 78)  # Lighter red
         self.button_pressed_color = (200, 35, 28)  # Darker red
         
+        # Fonts, text and button faces are rendered once
+        self.ui = UICache()
+        self.layout_ui()
+        self.set_render_scale(render_scale)
+        self.activate_style(style)  # Pulse Particles by default
+    
+    @property
+    def current_style(self):
+        return self.style.number
+    
+    def layout_ui(self):
+        """Place the start and style buttons for the current window size"""
+        width, height = self.width, self.height
+        self.start_button_center = (width // 2, height // 2 - 20)
+        
         # Style buttons settings
         self.style_buttons = []
         button_width = 100
         button_height = 30
         button_margin = 10
-        total_width = (button_width + button_margin) * 5 - button_margin
+        total_width = (button_width + button_margin) * len(STYLES) - button_margin
         start_x = (width - total_width) // 2
         
-        colors = [
-            (255, 89, 94),   # Red for Pulse
-            (45, 149, 150),  # Teal for Wave
-            (132, 94, 194),  # Purple for Stars
-            (255, 170, 51),  # Orange for Geometric
-            (29, 185, 84)    # Green for Fluid
-        ]
-        
-        for i in range(5):
+        for i, number in enumerate(STYLES):
+            color = STYLES[number].color
             self.style_buttons.append({
                 'rect': pygame.Rect(
                     start_x + i * (button_width + button_margin),
@@ -94,183 +190,259 @@ class MusicVisualizer:
                     button_width,
                     button_height
                 ),
-                'color': colors[i],
-                'hover_color': tuple(min(255, c + 30) for c in colors[i]),
-                'text': f'Style {i+1}',
-                'style_num': i + 1
+                'color': color,
+                'hover_color': tuple(min(255, c + 30) for c in color),
+                'text': f'Style {number}',
+                'style_num': number
             })
-        
-    def create_particle(self, energy):
-        """Create a new particle with pulse effect (Style 1)"""
-        angle = np.random.random() * 2 * np.pi
-        speed = self.pulse_speed * (0.5 + energy * 5)
-        
-        intensity = min(1.0, energy * 10)
-        color1 = np.array([255, 89, 94])  # Coral red
-        color2 = np.array([255, 202, 58])  # Warm yellow
-        color = tuple(map(int, color1 * (1 - intensity) + color2 * intensity))
-        
-        return {
-            'pos': [self.width/2, self.height/2],
-            'velocity': (math.cos(angle) * speed, math.sin(angle) * speed),
-            'radius': self.pulse_radius,
-            'color': color,
-            'alpha': 255,
-            'life': 1.0
-        }
+        self.ui.invalidate()
     
-    def create_star(self, energy):
-        """Create a new star (Style 3)"""
-        # 根据能量决定星星出现的位置（能量大时更集中在中心）
-        spread = max(0.2, 1.0 - energy * 2)  # 能量越大，spread越小
-        center_offset_x = (np.random.random() - 0.5) * self.width * spread
-        center_offset_y = (np.random.random() - 0.5) * self.height * spread
-        
-        # 在紫色和白色之间过渡
-        # 紫色基础：RGB(147, 112, 219)
-        # 白色：RGB(255, 255, 255)
-        purple = np.array([147, 112, 219])
-        white = np.array([255, 255, 255])
-        
-        # 根据能量在紫色和白色之间插值
-        transition = min(1.0, energy * 3)  # 能量大时更偏向白色
-        color = tuple(int(c) for c in purple * (1 - transition) + white * transition)
-        
-        # 星星大小和速度都受能量影响
-        size = max(4, min(15, energy * 60))  # 更大的尺寸范围
-        speed = energy * 5  # 移动速度随能量变化
-        angle = np.random.random() * 2 * np.pi
-        
-        return {
-            'pos': [self.width/2 + center_offset_x, self.height/2 + center_offset_y],
-            'velocity': (math.cos(angle) * speed, math.sin(angle) * speed),
-            'size': size,
-            'base_size': size,  # 保存原始大小用于脉动效果
-            'brightness': min(255, energy * 2000),
-            'color': color,
-            'pulse_phase': np.random.random() * 2 * np.pi,  # 用于制造脉动效果
-            'pulse_speed': 0.1,  # 脉动速度
-            'life': 1.0
-        }
+    def set_render_scale(self, scale):
+        """Change the internal render resolution (fraction of the window size)"""
+        self.render_scale = min(1.0, max(0.25, round(scale, 3)))
+        self.update_canvas()
     
-    def create_shape(self, energy):
-        """Create a new geometric shape (Style 4)"""
-        shape_type = np.random.choice(['triangle', 'square', 'pentagon'])
-        # 在屏幕范围内随机位置
-        pos_x = self.width/2 + np.random.randint(-200, 200)
-        pos_y = self.height/2 + np.random.randint(-150, 150)
-        
-        # 生成明亮的颜色
-        hue = np.random.random()  # 随机色相
-        color = tuple(int(c * 255) for c in colorsys.hsv_to_rgb(hue, 0.8, 1.0))
-        
-        return {
-            'pos': [pos_x, pos_y],
-            'type': shape_type,
-            'size': 40 + energy * 200,  # 增大基础大小和能量影响
-            'rotation': np.random.random() * 360,
-            'color': color,
-            'rotation_speed': np.random.random() * 4 - 2,  # 随机旋转速度
-            'life': 1.0
-        }
+    def update_canvas(self):
+        """(Re)allocate the canvas and everything sized to it"""
+        if self.render_scale == 1.0:
+            self.canvas = self.screen
+        else:
+            size = (max(1, round(self.width * self.render_scale)),
+                    max(1, round(self.height * self.render_scale)))
+            if self.canvas is self.screen or self.canvas.get_size() != size:
+                self.canvas = pygame.Surface(size, 0, self.screen)
+        self.compositor.resize(self.canvas.get_size())
+        self.raster.resize(self.canvas.get_size())
+        self.trails.clear()
     
-    def create_ripple(self, energy):
-        """Create a new ripple (Style 5)"""
-        return {
-            'pos': [self.width/2 + np.random.randint(-100, 100), 
-                   self.height/2 + np.random.randint(-100, 100)],
-            'radius': 5,
-            'max_radius': 100 + energy * 200,
-            'color': (0, 150, 255),
-            'width': 2,
-            'life': 1.0
-        }
-        
-    def audio_callback(self, indata, frames, time, status):
-        """Process audio input in real-time"""
+    def resize(self):
+        """Follow a window resize: relayout the UI and reallocate the canvas"""
+        self.screen = pygame.display.get_surface()
+        if self.recorder is not None and self.recorder.size != self.screen.get_size():
+            print("窗口大小改变，停止录制画面")
+            self.stop_capture()
+        self.width, self.height = self.screen.get_size()
+        self.canvas = self.screen
+        for style in self.styles.values():
+            style.resize()
+        self.layout_ui()
+        self.update_canvas()
+        print(f"窗口大小: {self.width}x{self.height}, 渲染比例 {self.render_scale:.0%}")
+    
+    def toggle_fullscreen(self):
+        self.fullscreen = not self.fullscreen
+        if self.fullscreen:
+            self.windowed_size = (self.width, self.height)
+            pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+        else:
+            pygame.display.set_mode(self.windowed_size, pygame.RESIZABLE)
+        self.resize()
+    
+    def present_scene(self):
+        """Upscale the canvas onto the display"""
+        if self.canvas is self.screen:
+            return
+        size = (self.width, self.height)
+        if self.smooth_upscale:
+            pygame.transform.smoothscale(self.canvas, size, self.screen)
+        else:
+            pygame.transform.scale(self.canvas, size, self.screen)
+    
+    def to_canvas(self, points):
+        """Display-space points as canvas pixels"""
+        if self.render_scale == 1.0:
+            return points
+        return (points * self.render_scale).astype(np.int32)
+    
+    def audio_callback(self, indata, frames, time_info, status):
+        """Copy audio input into the ring buffer (runs on the audio thread)"""
+        started = self.profiler.callback_start()
         if status:
-            print(status)
+            # Count flags here; printing from the audio thread causes more overflows
+            for flag in ('input_overflow', 'input_underflow'):
+                if getattr(status, flag, False):
+                    self.status_counts[flag] = self.status_counts.get(flag, 0) + 1
         
         if not self.recording:
+            self.profiler.callback_end(started, frames, self.sample_rate)
             return
             
         # Convert to mono if necessary
-        if self.channels == 2:
-            audio_data = np.mean(indata, axis=1)
+        if indata.shape[1] > 1:
+            if frames > len(self.mix_buffer):
+                self.mix_buffer = np.zeros(frames, dtype=np.float32)
+            audio_data = np.mean(indata, axis=1, out=self.mix_buffer[:frames])
         else:
             audio_data = indata[:, 0]
-            
-        # Calculate audio features
-        energy = np.sum(np.abs(audio_data)) / len(audio_data)
-        spectrum = np.abs(np.fft.fft(audio_data))[:len(audio_data)//2]
-        spectrum = spectrum / len(spectrum)
         
-        # Process based on current style
-        if self.current_style == 1:  # Pulse Particles
-            if len(self.particles) < self.max_particles:
-                self.particles.append(self.create_particle(energy))
+        self.ring.write(audio_data, capture_time(time_info, frames, self.sample_rate,
+                                                 self.input_latency))
+        if self.analysis is not None:
+            self.analysis.notify()
+        self.profiler.callback_end(started, frames, self.sample_rate)
+    
+    def start_analysis(self):
+        """Start the analysis stage that turns audio blocks into snapshots"""
+        if self.process_analysis is not None:
+            # The child process already analyses; we only read its frames
+            self.analysis = self.process_analysis
+            return
+        if self.subscriber is not None:
+            # Another machine analyses; we only render what it sends
+            self.analysis = self.subscriber
+            return
+        if self.publish_address and self.publisher is None:
+            from feature_broadcast import FeaturePublisher
+            self.publisher = FeaturePublisher(self.publish_address, self.sample_rate,
+                                              self.block_size, self.hop_size,
+                                              self.spectrum_analyzer.n_bands)
+        self.ring.reset()
+        self.analysis = AnalysisThread(self.ring, self.block_size, self.sample_rate,
+                                       self.spectrum_analyzer, hop_size=self.hop_size,
+                                       publish=self.publisher.publish if self.publisher else None)
+        self.analysis.start()
+    
+    def stop_analysis(self):
+        if self.analysis is not None:
+            self.analysis.stop()
+    
+    def check_analysis_process(self):
+        """Fall back to in-process capture if the analysis process died"""
+        if self.process_analysis is None or self.process_analysis.check():
+            return
+        print(f"分析进程异常: {self.process_analysis.error}，切换到进程内分析")
+        self.process_analysis.stop()
+        self.process_analysis = None
+        self.analysis = None
+        self.analysis_process = False
+        self.last_seq = 0
+        self.last_beats = 0
+        self.open_audio_async(on_ready=self.start_analysis)
+    
+    def check_subscriber(self):
+        """Follow the publisher's hop and window, which set the spawn rate per frame"""
+        sub = self.subscriber
+        if sub is None or sub.hop_size is None:
+            return
+        if (sub.hop_size, sub.block_size) != (self.hop_size, self.block_size):
+            self.hop_size, self.block_size = sub.hop_size, sub.block_size
+            print(f"发布端分析参数: hop {self.hop_size} / window {self.block_size}")
+    
+    def consume_features(self):
+        """Apply the newest published snapshot on the render thread"""
+        if self.analysis is None:
+            return
+        snapshot = self.analysis.latest
+        if snapshot is None or snapshot.seq == self.last_seq:
+            return
+        # One element per analysed block, as before, even if several arrived this frame
+        blocks = snapshot.seq - self.last_seq
+        self.last_seq = snapshot.seq
+        # Count beats from the running total so beats in skipped blocks still burst
+        beats = max(0, snapshot.beats - self.last_beats)
+        self.last_beats = snapshot.beats
+        self.process_features(snapshot, blocks, beats)
+    
+    def spawn_count(self, blocks):
+        """Elements to spawn for ``blocks`` new analysis hops at the current spawn rate"""
+        # spawn_per_block is per block_size samples, whatever the hop
+        per_hop = self.spawn_per_block * self.hop_size / self.block_size
+        self._spawn_credit += blocks * per_hop * self.style.spawn_scale
+        count = int(self._spawn_credit)
+        self._spawn_credit -= count
+        return count
+    
+    def beat_count(self, beats, confidence):
+        """Burst size for ``beats`` new beats, scaled by tempo confidence and quality"""
+        style = self.style
+        return int(round(beats * style.beat_burst * (0.5 + 0.5 * confidence) * style.spawn_scale))
+    
+    def process_features(self, snapshot, blocks=1, beats=0):
+        """Spawn elements and update histories from one feature snapshot"""
+        energy = snapshot.energy
+        self.tempo = snapshot.tempo
+        self.beat_confidence = snapshot.confidence
+        self.pending_capture = snapshot.capture_time
+        count = self.spawn_count(blocks) + self.beat_count(beats, snapshot.confidence)
         
-        elif self.current_style == 2:  # Wave Lines
-            self.wave_points = []
-            for i, amp in enumerate(spectrum[:100]):
-                x = i * (self.width / 100)
-                y = self.height/2 + amp * self.height * 2
-                self.wave_points.append((int(x), int(y)))  # Convert to integers
-            
-            if len(self.wave_points) > 1:  # Only add if we have valid points
-                self.wave_history.append(self.wave_points)
-                if len(self.wave_history) > self.max_wave_history:
-                    self.wave_history.pop(0)
-                
-        elif self.current_style == 3:  # Star Field
-            if len(self.stars) < self.max_stars:
-                self.stars.append(self.create_star(energy))
-                
-        elif self.current_style == 4:  # Geometric Shapes
-            if len(self.shapes) < self.max_shapes:
-                self.shapes.append(self.create_shape(energy))
-                
-        elif self.current_style == 5:  # Fluid Ripples
-            if len(self.ripples) < self.max_ripples:
-                self.ripples.append(self.create_ripple(energy))
+        self.style.spawn(snapshot, count)
         
         # Store energy history
         self.energy_history.append(energy)
-        if len(self.energy_history) > self.max_history:
-            self.energy_history.pop(0)
+    
+    def activate_style(self, number):
+        """Make ``number`` the active style, suspending the current one"""
+        previous = self.style
+        if previous is not None:
+            if previous.number == number:
+                return
+            previous.suspend()
+            self.suspended[previous.number] = previous
+        style = self.suspended.pop(number, None) or self.styles.get(number)
+        if style is None:
+            style = self.styles[number] = STYLES[number](self)
+        self.style = style
+        # Keep only the most recently used suspended styles around
+        while len(self.suspended) > self.max_suspended:
+            old_number, old = self.suspended.popitem(last=False)
+            old.release()
+            del self.styles[old_number]
+        self.apply_quality(number)
+    
+    def set_style(self, style):
+        """Switch the active style and apply its quality level"""
+        self.activate_style(style)
+        self.governor.reset()
+        print(f"切换到样式 {style}: {self.style_names[style]}")
+    
+    def apply_quality(self, style=None):
+        """Set ``style``'s knobs from its full-quality values and governor level"""
+        style = style or self.current_style
+        if style in self.styles:
+            self.styles[style].apply_quality(self.governor.quality(style))
+    
+    def quality_level(self, style=None):
+        """Governor level (0 = full) and quality fraction for ``style``"""
+        style = style or self.current_style
+        return self.governor.level(style), self.governor.quality(style)
+    
+    def govern(self, work_time):
+        """Feed one frame's work time to the governor and apply any change"""
+        if self.governor.observe(self.current_style, work_time):
+            level, quality = self.quality_level()
+            self.apply_quality()
+            print(f"画质调整: {self.style_names[self.current_style]} -> 等级 {level} ({quality:.0%})")
+    
+    def audio_stats(self):
+        """Overflow/underrun counters of the capture and analysis stages"""
+        stats = dict(self.status_counts)
+        stats['ring_overflows'] = self.ring.overflows
+        stats['analysis_underruns'] = self.analysis.underruns if self.analysis else 0
+        stats['analysis_cost'] = self.spectrum_analyzer.stats()
+        stats.update(self.subscriber.stats() if self.subscriber is not None else self.subscriber_stats)
+        if self.publisher is not None:
+            stats.update(self.publisher.stats())
+        if self.process_analysis is not None:
+            process_stats = self.process_analysis.stats()
+            cost_us = process_stats.pop('process_cost_us', 0.0)
+            period_us = self.hop_size / self.sample_rate * 1e6
+            stats.update(process_stats)
+            stats['analysis_cost'] = {'blocks': process_stats.get('process_blocks', 0),
+                                      'mean_us': cost_us, 'budget_fraction': cost_us / period_us}
+        return stats
+    
+    def latency_stats(self):
+        """Capture-to-flip latency percentiles in milliseconds"""
+        if not self.latencies:
+            return {}
+        values = np.array(self.latencies) * 1000
+        return {'p50_ms': round(float(np.percentile(values, 50)), 1),
+                'p95_ms': round(float(np.percentile(values, 95)), 1),
+                'max_ms': round(float(values.max()), 1)}
     
     def update_particles(self):
-        """Update all visualization elements"""
-        # Update Style 1: Pulse Particles
-        for particle in self.particles[:]:
-            particle['pos'][0] += particle['velocity'][0]
-            particle['pos'][1] += particle['velocity'][1]
-            particle['radius'] += self.pulse_speed
-            particle['alpha'] = int(255 * particle['life'])
-            particle['life'] -= 0.01
-            if particle['life'] <= 0:
-                self.particles.remove(particle)
-        
-        # Update Style 3: Stars
-        for star in self.stars[:]:
-            star['life'] -= 0.005
-            if star['life'] <= 0:
-                self.stars.remove(star)
-        
-        # Update Style 4: Geometric Shapes
-        for shape in self.shapes[:]:
-            shape['rotation'] += shape['rotation_speed']  # 使用独立的旋转速度
-            shape['size'] *= 0.99  # 降低缩小速度
-            shape['life'] -= 0.008  # 延长生命周期
-            if shape['life'] <= 0 or shape['size'] < 10:
-                self.shapes.remove(shape)
-        
-        # Update Style 5: Fluid Ripples
-        for ripple in self.ripples[:]:
-            ripple['radius'] = min(ripple['radius'] + 2, ripple['max_radius'])
-            ripple['life'] -= 0.01
-            if ripple['life'] <= 0:
-                self.ripples.remove(ripple)
+        """Update the active style's elements (suspended styles stay frozen)"""
+        self.style.update()
     
     def is_mouse_over_start_button(self, mouse_pos):
         """Check if mouse is over the circular start button"""
@@ -287,223 +459,378 @@ class MusicVisualizer:
         """Draw the start button"""
         # Determine button color based on mouse position
         color = self.button_hover_color if self.is_mouse_over_start_button(mouse_pos) else self.button_color
-        
-        # Draw main circle button
-        pygame.draw.circle(self.screen, color, self.start_button_center, self.start_button_radius)
-        
-        # Add highlight effect
-        highlight_radius = self.start_button_radius - 2
-        pygame.draw.circle(self.screen, (255, 255, 255, 128), 
-                         (self.start_button_center[0], self.start_button_center[1] - 2), 
-                         highlight_radius, 2)
-        
-        # Draw "Start" text below the button
-        font = pygame.font.Font(None, 36)
-        text = font.render("Start", True, (255, 255, 255))
-        text_rect = text.get_rect(center=(self.start_button_center[0], 
-                                        self.start_button_center[1] + self.start_button_radius + 20))
-        self.screen.blit(text, text_rect)
+        face = self.ui.start_button(self.start_button_center, self.start_button_radius, color)
+        self.screen.blit(face, face.get_rect(center=self.start_button_center))
     
-    def draw_wave_lines(self):
-        """Draw wave line visualization (Style 2)"""
-        for i, points in enumerate(self.wave_history):
-            alpha = int(255 * (i / len(self.wave_history)))
-            s = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-            if len(points) > 1:
-                pygame.draw.lines(s, (100, 200, 255, alpha), False, points, 2)
-            self.screen.blit(s, (0, 0))
-    
-    def draw_stars(self):
-        """Draw star field visualization (Style 3)"""
-        for star in self.stars:
-            # 更新星星位置
-            star['pos'][0] = (star['pos'][0] + star['velocity'][0]) % self.width
-            star['pos'][1] = (star['pos'][1] + star['velocity'][1]) % self.height
-            
-            # 更新脉动相位
-            star['pulse_phase'] += star['pulse_speed']
-            pulse = math.sin(star['pulse_phase']) * 0.3 + 1.0
-            current_size = star['base_size'] * pulse
-            
-            # 创建发光效果
-            for size_mult in [3.0, 2.5, 2.0, 1.5, 1.0]:  # 增加更多光晕层
-                alpha = int(star['brightness'] * star['life'] * (0.2 if size_mult > 1 else 1.0))
-                color = (*star['color'], alpha)
-                
-                # 绘制主星体
-                s = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-                size = int(current_size * size_mult)
-                pygame.draw.circle(s, color,
-                                (int(star['pos'][0]), int(star['pos'][1])),
-                                size)
-                
-                # 在最外层添加十字光芒
-                if size_mult == 3.0:
-                    ray_length = current_size * 3
-                    ray_width = max(1, current_size / 3)
-                    ray_color = (*star['color'][:3], alpha // 2)  # 只使用RGB值，忽略Alpha
-                    
-                    # 绘制四个方向的光芒
-                    for angle in [0, 45, 90, 135]:
-                        rad = math.radians(angle)
-                        dx = math.cos(rad) * ray_length
-                        dy = math.sin(rad) * ray_length
-                        pygame.draw.line(s,
-                                     ray_color,
-                                     (int(star['pos'][0] - dx), int(star['pos'][1] - dy)),
-                                     (int(star['pos'][0] + dx), int(star['pos'][1] + dy)),
-                                     int(ray_width))
-                
-                self.screen.blit(s, (0, 0))
-    
-    def draw_shapes(self):
-        """Draw geometric shapes visualization (Style 4)"""
-        for shape in self.shapes:
-            points = []
-            sides = {'triangle': 3, 'square': 4, 'pentagon': 5}[shape['type']]
-            for i in range(sides):
-                angle = math.radians(shape['rotation'] + (360 / sides) * i)
-                x = shape['pos'][0] + math.cos(angle) * shape['size']
-                y = shape['pos'][1] + math.sin(angle) * shape['size']
-                points.append((int(x), int(y)))  # Convert to integers
-            s = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-            pygame.draw.polygon(s, (*shape['color'], int(255 * shape['life'])), points)
-            self.screen.blit(s, (0, 0))
-    
-    def draw_ripples(self):
-        """Draw fluid ripples visualization (Style 5)"""
-        for ripple in self.ripples:
-            color = (*ripple['color'], int(255 * ripple['life']))
-            s = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-            pygame.draw.circle(s, color,
-                            (int(ripple['pos'][0]), int(ripple['pos'][1])),
-                            int(ripple['radius']),
-                            ripple['width'])
-            self.screen.blit(s, (0, 0))
+    def trail(self, key, history):
+        """Feedback buffer for ``key``, faded once for this frame"""
+        trail = self.trails.get(key)
+        if trail is None:
+            trail = self.trails[key] = TrailBuffer(self.canvas.get_size())
+        # Same visual length as ``history`` blocks of redrawn history, at the
+        # rate frames are shown (offline renders pass their --fps here)
+        frames = history * self.block_size / self.sample_rate * self.target_fps
+        trail.fade(TrailBuffer.fade_factor(frames))
+        return trail
+    
+    def toggle_trail_mode(self):
+        self.trail_mode = not self.trail_mode
+        for trail in self.trails.values():
+            trail.clear()
+        print(f"拖尾模式: {'开' if self.trail_mode else '关'}")
+    
+    def start_capture(self):
+        """Start recording displayed frames (raw RGB24 for .rgb/.raw paths, else PNGs)"""
+        path = self.record_path or time.strftime("capture_%Y%m%d_%H%M%S.rgb")
+        raw = path.lower().endswith(('.rgb', '.raw'))
+        self.recorder = FrameRecorder((self.width, self.height),
+                                      out_dir=None if raw else path, raw_path=path if raw else None,
+                                      buffers=self.record_buffers, policy=self.record_policy)
+        print(f"开始录制画面: {path}")
+    
+    def stop_capture(self):
+        if self.recorder is None:
+            return
+        recorder, self.recorder = self.recorder, None
+        if not recorder.stop():
+            print(f"录制写入超时: 还有 {recorder.unwritten} 帧未写完，后台继续写入")
+            self.finishing.append(recorder)
+        print(f"录制结束: {recorder.stats()}")
+        if recorder.error is not None:
+            print(f"录制错误: {recorder.error}")
+        if recorder.raw_path:
+            width, height = recorder.size
+            print(f"ffmpeg -f rawvideo -pix_fmt rgb24 -s {width}x{height} -r {self.target_fps} "
+                  f"-i {recorder.raw_path} out.mp4")
+    
+    def finish_recordings(self):
+        """Wait for recordings still being written before shutting down"""
+        for recorder in self.finishing:
+            print(f"等待录制写完: 还有 {recorder.unwritten} 帧")
+            recorder.finish()
+            print(f"录制写完: {recorder.stats()}")
+        self.finishing.clear()
+    
+    def toggle_capture(self):
+        if self.recorder is None:
+            self.start_capture()
+        else:
+            self.stop_capture()
+    
+    def toggle_raster_mode(self):
+        self.raster_mode = not self.raster_mode
+        print(f"NumPy 光栅化 ({self.raster.blend}): {'开' if self.raster_mode else '关'}")
     
     def draw_style_buttons(self, mouse_pos):
         """Draw the style selection buttons"""
         if not self.recording:
             return
-            
-        for button in self.style_buttons:
-            # Determine color based on hover and selection state
-            color = button['color']
-            if button['rect'].collidepoint(mouse_pos):
-                color = button['hover_color']
-            if button['style_num'] == self.current_style:
-                # Draw selection indicator
-                pygame.draw.rect(self.screen, (255, 255, 255),
-                               button['rect'].inflate(4, 4), 2, border_radius=5)
-            
-            # Draw button
-            pygame.draw.rect(self.screen, color, button['rect'], border_radius=5)
-            
-            # Draw text
-            font = pygame.font.Font(None, 24)
-            text = font.render(button['text'], True, (255, 255, 255))
-            text_rect = text.get_rect(center=button['rect'].center)
-            self.screen.blit(text, text_rect)
+        
+        # Pre-composited bar, rebuilt only when hover or selection changes
+        hovered = self.get_style_button_at_pos(mouse_pos)
+        bar, pos = self.ui.style_bar(self.style_buttons,
+                                     hovered['style_num'] if hovered else None,
+                                     self.current_style)
+        self.screen.blit(bar, pos)
     
     def draw_countdown(self):
         """Draw countdown before recording starts"""
-        font = pygame.font.Font(None, 74)
-        text = font.render(str(max(1, int(self.countdown))), True, (255, 255, 255))
+        text = self.ui.text(str(max(1, int(self.countdown))), 74)
         text_rect = text.get_rect(center=(self.width/2, self.height/2))
         self.screen.blit(text, text_rect)
     
     def draw(self):
         """Draw the visualization"""
-        # Fill background with dark color
-        self.screen.fill((15, 15, 35))
-        
         mouse_pos = pygame.mouse.get_pos()
+        # The countdown stays up (showing "1") until the audio device is ready
+        in_scene = self.started and self.recording
+        
+        # Fill background with dark color (a scaled canvas covers the whole screen)
+        if not in_scene or self.canvas is self.screen:
+            self.screen.fill(self.background_color)
         
         if not self.started:
             self.draw_start_button(mouse_pos)
-        elif not self.recording and self.countdown > 0:
+        elif not in_scene:
             self.draw_countdown()
         else:
-            if self.current_style == 1:  # Pulse Particles
-                for particle in self.particles:
-                    s = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-                    pygame.draw.circle(s, (*particle['color'], particle['alpha']),
-                                    (int(particle['pos'][0]), int(particle['pos'][1])),
-                                    int(particle['radius']), 2)
-                    self.screen.blit(s, (0,0))
-            elif self.current_style == 2:  # Wave Lines
-                self.draw_wave_lines()
-            elif self.current_style == 3:  # Star Field
-                self.draw_stars()
-            elif self.current_style == 4:  # Geometric Shapes
-                self.draw_shapes()
-            elif self.current_style == 5:  # Fluid Ripples
-                self.draw_ripples()
-            
-            self.draw_style_buttons(mouse_pos)
-        
-        pygame.display.flip()
+            self.draw_scene()
+            with self.profiler.phase('ui'):
+                self.draw_style_buttons(mouse_pos)
+        
+        if self.profiler.show_hud:
+            self.profiler.draw_hud(self.screen, self.hud_info())
+        with self.profiler.phase('flip'):
+            pygame.display.flip()
+        if self.recorder is not None:
+            with self.profiler.phase('capture'):
+                self.recorder.capture(self.screen)
+        if self.pending_capture:
+            self.latencies.append(time.perf_counter() - self.pending_capture)
+            self.pending_capture = 0.0
+    
+    def draw_scene(self):
+        """Draw the current style's visuals onto the canvas and present it on the screen"""
+        if self.canvas is not self.screen:
+            self.canvas.fill(self.background_color)
+        with self.profiler.phase('draw_' + self.style.name):
+            self.style.draw()
+        with self.profiler.phase('upscale'):
+            self.present_scene()
+    
+    def hud_info(self):
+        """Audio pipeline lines for the profiler HUD"""
+        stats = self.audio_stats()
+        cost = stats.pop('analysis_cost')
+        return {
+            'audio': ", ".join(f"{k}={v}" for k, v in stats.items()),
+            'analysis': f"{cost['mean_us']:.0f} us/hop ({cost['budget_fraction'] * 100:.1f}% of period), "
+                        f"hop {self.hop_size} / window {self.block_size}",
+            'latency': "capture->flip " + ", ".join(f"{k}={v}" for k, v in self.latency_stats().items()),
+            'quality': "level {} ({:.0%}), render scale {:.0%}".format(*self.quality_level(),
+                                                                        self.render_scale),
+            'tempo': f"{self.tempo:.0f} bpm (confidence {self.beat_confidence:.2f}, {self.last_beats} beats)",
+            'raster': f"{self.raster.blend}, {self.raster.samples} samples" if self.raster_mode else "off",
+            'capture': ", ".join(f"{k}={v}" for k, v in self.recorder.stats().items())
+                       if self.recorder is not None else "off",
+            'broadcast': self.broadcast_status(),
+        }
+    
+    def broadcast_status(self):
+        if self.subscriber is not None:
+            stats = self.subscriber.stats()
+            return (f"subscribed {self.subscribe_address}: {stats['received']} received, "
+                    f"{stats['lost']} lost, {stats['late']} late")
+        if self.publisher is not None:
+            return f"publishing {self.publish_address}: {self.publisher.sent} sent"
+        return "off"
+    
+    def element_counts(self):
+        """Live element counts per style"""
+        return {style.element_name: style.element_count() for style in self.styles.values()}
+    
+    def open_audio_async(self, on_ready=None):
+        """Open the input stream (or analysis process) on a background thread"""
+        def open_stream():
+            try:
+                if self.subscribe_address:
+                    from feature_broadcast import FeatureSubscriber
+                    subscriber = FeatureSubscriber(self.subscribe_address,
+                                                   self.spectrum_analyzer.n_bands)
+                    subscriber.start()
+                    self.subscriber = subscriber
+                elif self.analysis_process:
+                    from shared_features import ProcessAnalysis
+                    analysis = ProcessAnalysis(self.sample_rate, self.block_size, self.channels,
+                                               n_bands=self.spectrum_analyzer.n_bands,
+                                               hop_size=self.hop_size,
+                                               device_block_size=self.device_block_size,
+                                               latency=self.latency)
+                    analysis.start()
+                    self.process_analysis = analysis
+                else:
+                    sd = sounddevice()
+                    stream = sd.InputStream(callback=self.audio_callback,
+                                            channels=self.channels,
+                                            samplerate=self.sample_rate,
+                                            blocksize=self.device_block_size,
+                                            latency=self.latency)
+                    self.input_latency = stream.latency
+                    stream.start()
+                    self.stream = stream
+                self.audio_ready = True
+                print(f"音频设备就绪 ({time.perf_counter() - LAUNCH_TIME:.2f}s)")
+                if on_ready is not None:
+                    on_ready()
+            except Exception as e:
+                self.stream_error = e
+        
+        self.audio_opener = threading.Thread(target=open_stream, name="audio-open", daemon=True)
+        self.audio_opener.start()
+    
+    def close_audio(self):
+        if self.audio_opener is not None:
+            self.audio_opener.join(5.0)
+        if self.process_analysis is not None:
+            self.process_analysis.stop()
+        if self.publisher is not None:
+            self.publisher.close()
+        if self.subscriber is not None:
+            # Not yet handed to self.analysis if we quit during the countdown
+            self.subscriber.stop()
+            self.subscriber_stats = self.subscriber.stats()
+            self.subscriber = None
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
     
     def run(self):
         """Main loop"""
         try:
-            with sd.InputStream(callback=self.audio_callback,
-                              channels=self.channels,
-                              samplerate=self.sample_rate,
-                              blocksize=self.block_size):
-                print("等待用户点击开始按钮...")
-                print("提示：可以点击底部按钮或按1-5键切换不同的视觉效果")
-                
-                start_time = None
-                running = True
-                clock = pygame.time.Clock()
+            print("等待用户点击开始按钮...")
+            print(f"提示：可以点击底部按钮或按1-{len(STYLES)}键切换不同的视觉效果")
+            
+            start_time = None
+            frame_count = 0
+            running = True
+            clock = pygame.time.Clock()
+            
+            if self.subscribe_address:
+                # Render nodes start on their own: nobody is there to click
+                self.started = True
+                start_time = time.time()
+                self.open_audio_async()
+            
+            while running:
+                self.profiler.begin_frame()
+                frame_start = time.perf_counter()
+                current_time = time.time()
+                mouse_pos = pygame.mouse.get_pos()
                 
-                while running:
-                    current_time = time.time()
-                    mouse_pos = pygame.mouse.get_pos()
-                    
+                with self.profiler.phase('events'):
                     for event in pygame.event.get():
                         if event.type == pygame.QUIT:
                             running = False
+                        elif event.type == pygame.VIDEORESIZE:
+                            self.resize()
                         elif event.type == pygame.MOUSEBUTTONDOWN:
                             if not self.started and self.is_mouse_over_start_button(event.pos):
                                 self.started = True
                                 start_time = current_time
+                                self.open_audio_async()
                                 print("准备开始录音...")
                                 print("3秒倒计时后开始...")
                             elif self.recording:  # Only handle style buttons when recording
                                 style_button = self.get_style_button_at_pos(event.pos)
                                 if style_button:
-                                    self.current_style = style_button['style_num']
-                                    print(f"切换到样式 {self.current_style}: {self.style_names[self.current_style]}")
+                                    self.set_style(style_button['style_num'])
                         elif event.type == pygame.KEYDOWN:
-                            # Handle number keys 1-5 for style switching
-                            if event.key in [pygame.K_1, pygame.K_2, pygame.K_3, pygame.K_4, pygame.K_5]:
-                                new_style = int(event.unicode)
-                                if 1 <= new_style <= 5:
-                                    self.current_style = new_style
-                                    print(f"切换到样式 {new_style}: {self.style_names[new_style]}")
-                    
+                            if event.key == pygame.K_F3:
+                                self.profiler.toggle_hud()
+                            elif event.key == pygame.K_t:
+                                self.toggle_trail_mode()
+                            elif event.key == pygame.K_b:
+                                self.toggle_raster_mode()
+                            elif event.key == pygame.K_r:
+                                self.toggle_capture()
+                            elif event.key == pygame.K_F11:
+                                self.toggle_fullscreen()
+                            elif event.key in (pygame.K_LEFTBRACKET, pygame.K_RIGHTBRACKET):
+                                step = 0.125 if event.key == pygame.K_RIGHTBRACKET else -0.125
+                                self.set_render_scale(self.render_scale + step)
+                                print(f"渲染比例: {self.render_scale:.0%}")
+                            # Handle number keys for style switching
+                            elif event.unicode.isdigit() and int(event.unicode) in STYLES:
+                                self.set_style(int(event.unicode))
+                
                     if self.started and not self.recording:
                         self.countdown = 3 - (current_time - start_time)
-                        if self.countdown <= 0:
+                        if self.stream_error is not None:
+                            raise self.stream_error
+                        # Keep showing "1" until the device has finished opening
+                        if self.countdown <= 0 and self.audio_ready:
+                            self.start_analysis()
                             self.recording = True
                             print("开始录音！请说话或播放音乐...")
-                    
-                    for event in pygame.event.get():
-                        if event.type == pygame.QUIT:
-                            running = False
-                    
-                    if self.recording:
+                            if self.record_path and self.recorder is None:
+                                self.start_capture()
+                
+                if self.recording:
+                    if self.analysis_process and frame_count % 30 == 0:
+                        self.check_analysis_process()
+                    if self.subscriber is not None and frame_count % 30 == 0:
+                        self.check_subscriber()
+                    if self.stream_error is not None:
+                        raise self.stream_error
+                    with self.profiler.phase('simulate'):
+                        self.consume_features()
                         self.update_particles()
-                    self.draw()
-                    clock.tick(60)  # Cap at 60 FPS
-                    
+                self.draw()
+                if self.time_to_first_frame is None:
+                    self.time_to_first_frame = time.perf_counter() - LAUNCH_TIME
+                    print(f"首帧耗时: {self.time_to_first_frame:.3f}s")
+                self.profiler.end_frame(self.element_counts() if self.profiler.enabled else None)
+                if self.recording:
+                    self.govern(time.perf_counter() - frame_start)
+                frame_count += 1
+                clock.tick(self.target_fps)  # Cap at target FPS
+                
         except Exception as e:
             print(f"Error: {str(e)}")
         finally:
+            self.stop_capture()
+            self.finish_recordings()
+            self.stop_analysis()
+            self.close_audio()
+            print(f"音频统计: {self.audio_stats()}")
+            print(f"延迟 (采集->显示): {self.latency_stats()}")
+            for style in self.styles.values():
+                if style.stats():
+                    print(f"{style.name}: {style.stats()}")
+            self.profiler.close()
             pygame.quit()
 
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Multi-style music visualizer")
+    parser.add_argument('--profile', action='store_true', help="enable timers and show the HUD (toggle with F3)")
+    parser.add_argument('--profile-log', help="rolling per-frame log (.csv, or .jsonl for JSON lines)")
+    parser.add_argument('--target-fps', type=int, default=60, help="frame rate the quality governor holds")
+    parser.add_argument('--fixed-quality', action='store_true', help="disable the adaptive quality governor")
+    parser.add_argument('--analysis-process', action='store_true',
+                        help="capture and analyse audio in a separate process (shared memory)")
+    parser.add_argument('--hop-size', type=int, help="samples between analyses (default: the 2048 window)")
+    parser.add_argument('--device-block', type=int, help="frames per device callback (default: hop size)")
+    parser.add_argument('--latency', help="device latency: low, high or seconds")
+    parser.add_argument('--low-latency', action='store_true',
+                        help="preset: 256-sample hops and device blocks, low device latency")
+    parser.add_argument('--size', default='800x600', help="window size, WIDTHxHEIGHT")
+    parser.add_argument('--fullscreen', action='store_true', help="start fullscreen (toggle with F11)")
+    parser.add_argument('--render-scale', type=float, default=1.0,
+                        help="internal render resolution as a fraction of the window ([ and ] adjust)")
+    parser.add_argument('--nearest-upscale', action='store_true',
+                        help="upscale the canvas with nearest-neighbour instead of smoothscale")
+    parser.add_argument('--record', help="record the displayed frames from the start: a .rgb/.raw "
+                                         "RGB24 file or a directory of PNGs (R toggles)")
+    parser.add_argument('--record-policy', choices=('drop', 'block'), default='drop',
+                        help="when the writer falls behind: drop frames or wait for it")
+    parser.add_argument('--record-buffers', type=int, default=8, help="preallocated frame buffers")
+    parser.add_argument('--style', type=int, default=1, choices=list(STYLES), help="style to start with")
+    parser.add_argument('--publish', metavar='ADDR',
+                        help="send analysed features to other displays: HOST:PORT (multicast ok) "
+                             "or unix:/path, comma-separated")
+    parser.add_argument('--subscribe', metavar='ADDR',
+                        help="render features received on HOST:PORT or unix:/path instead of "
+                             "capturing audio")
+    parser.add_argument('--raster', nargs='?', const='add', choices=('add', 'alpha'),
+                        help="draw particles and stars with the NumPy rasterizer (toggle with B)")
+    args = parser.parse_args(argv)
+    if args.subscribe and (args.publish or args.analysis_process):
+        parser.error("--subscribe renders received features; it cannot capture or publish")
+    if args.publish and args.analysis_process:
+        parser.error("--publish needs in-process analysis (drop --analysis-process)")
+    
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    latency = args.latency
+    if latency not in (None, 'low', 'high'):
+        latency = float(latency)
+    if args.low_latency:
+        args.hop_size = args.hop_size or 256
+        latency = latency or 'low'
+    visualizer = MusicVisualizer(width, height,
+                                 profile=args.profile or bool(args.profile_log),
+                                 profile_log=args.profile_log, target_fps=args.target_fps,
+                                 analysis_process=args.analysis_process,
+                                 render_scale=args.render_scale, fullscreen=args.fullscreen,
+                                 hop_size=args.hop_size, device_block_size=args.device_block,
+                                 latency=latency, raster=args.raster, record=args.record,
+                                 record_policy=args.record_policy,
+                                 record_buffers=args.record_buffers, publish=args.publish,
+                                 subscribe=args.subscribe, style=args.style)
+    visualizer.smooth_upscale = not args.nearest_upscale
+    visualizer.governor.enabled = not args.fixed_quality
+    visualizer.run()
+
 if __name__ == "__main__":
-    visualizer = MusicVisualizer()
-    visualizer.run()
\ No newline at end of file
+    main()
\ No newline at end of file
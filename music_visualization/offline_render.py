@@ -0,0 +1,187 @@
+"""Render a visualization from an audio file without a microphone or window.
+
+Example:
+    python music_visualization/offline_render.py song.wav --style 3 --out-dir frames --seed 7
+    python music_visualization/offline_render.py song.wav --raw frames.rgb
+    ffmpeg -f rawvideo -pix_fmt rgb24 -s 800x600 -r 60 -i frames.rgb -i song.wav out.mp4
+"""
+import argparse
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+
+def load_audio(path: str, sample_rate: int = None):
+    """Load any audio file as mono float32; WAV is read without extra dependencies
+
+    ``sample_rate`` resamples to that rate (needs librosa); None keeps the file's rate.
+    """
+    if path.lower().endswith('.wav'):
+        try:
+            data, rate = load_wav(path)
+        except (wave.Error, ValueError):
+            pass  # e.g. float or compressed WAV: let librosa handle it
+        else:
+            if sample_rate is None or sample_rate == rate:
+                return data, rate
+            import librosa
+            return librosa.resample(data, orig_sr=rate, target_sr=sample_rate).astype(np.float32), sample_rate
+    import librosa  # heavy (scipy, numba): only imported when actually needed
+    data, rate = librosa.load(path, sr=sample_rate, mono=True)
+    return data.astype(np.float32), rate
+
+
+def load_wav(path: str):
+    """Read a PCM WAV file as mono float32 in [-1, 1]; returns (samples, rate)"""
+    with wave.open(path, 'rb') as wav:
+        rate = wav.getframerate()
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        raw = wav.readframes(wav.getnframes())
+
+    if width == 1:
+        data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        data = np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768
+    elif width == 3:
+        # 24-bit: widen each little-endian triple to int32
+        triples = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = triples[:, 0] | (triples[:, 1] << 8) | (triples[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        data = ints.astype(np.float32) / 8388608
+    elif width == 4:
+        data = np.frombuffer(raw, dtype='<i4').astype(np.float32) / 2147483648
+    else:
+        raise ValueError(f"Unsupported sample width: {width} bytes")
+
+    if channels > 1:
+        data = data.reshape(-1, channels).mean(axis=1)
+    return data.astype(np.float32), rate
+
+
+class FrameWriter:
+    """Writes rendered frames as numbered PNGs or one raw RGB24 stream"""
+
+    def __init__(self, out_dir: str = None, raw_path: str = None):
+        self.out_dir = out_dir
+        self.raw = open(raw_path, 'wb') if raw_path else None
+        self.frames = 0
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+
+    def write(self, surface):
+        import pygame
+        self.frames += 1
+        if self.out_dir:
+            pygame.image.save(surface, os.path.join(self.out_dir, f"frame_{self.frames:06d}.png"))
+        if self.raw:
+            self.raw.write(pygame.image.tobytes(surface, 'RGB'))
+
+    def close(self):
+        if self.raw:
+            self.raw.close()
+
+
+def render_file(path: str, style: int = 1, fps: int = 60, width: int = 800, height: int = 600,
+                seed: int = None, out_dir: str = None, raw_path: str = None,
+                block_size: int = 2048, max_frames: int = None, cache_dir: str = None,
+                use_cache: bool = True) -> dict:
+    """Run an audio file through the live analysis and style code at fixed steps"""
+    # Must be set before pygame initialises the display
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    from music_visualizer import MusicVisualizer, N_BANDS
+    from audio_pipeline import AnalysisThread
+
+    load_start = time.perf_counter()
+    track = None
+    if use_cache:
+        from feature_cache import FeatureCache, TrackPlayback
+        # Features come from the cache: no decoding and no FFTs on a hit
+        track = FeatureCache(cache_dir).get(path, block_size, n_bands=N_BANDS, load_audio=load_audio)
+        rate, n_samples = track.sample_rate, track.meta['samples']
+    else:
+        samples, rate = load_audio(path)
+        n_samples = len(samples)
+
+    # Rate, window and hop set together, so the ring, analyser and spawn rate agree
+    viz = MusicVisualizer(width, height, seed=seed, sample_rate=rate, block_size=block_size,
+                          style=style, target_fps=fps)
+    viz.started = True
+    viz.recording = True
+    if track is not None:
+        viz.analysis = TrackPlayback(track)
+    else:
+        # Same analysis stage as live capture, driven synchronously instead of by a thread
+        viz.analysis = AnalysisThread(viz.ring, block_size, rate, viz.spectrum_analyzer)
+
+    writer = FrameWriter(out_dir, raw_path)
+    total_frames = int(n_samples / rate * fps)
+    if max_frames is not None:
+        total_frames = min(total_frames, max_frames)
+
+    fed = 0
+    start = time.perf_counter()
+    startup = start - load_start
+    try:
+        for frame in range(total_frames):
+            # Feed every whole block that has been "captured" by this frame's time
+            target = int((frame + 1) * rate / fps)
+            if track is not None:
+                viz.analysis.advance(target)
+            while track is None and fed + block_size <= target:
+                viz.ring.write(samples[fed:fed + block_size])
+                viz.analysis.poll()
+                fed += block_size
+            viz.consume_features()
+            viz.update_particles()
+            viz.screen.fill(viz.background_color)
+            viz.draw_scene()
+            writer.write(viz.screen)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    duration = total_frames / fps
+    return {
+        'frames': writer.frames,
+        'startup_seconds': startup,
+        'audio_seconds': duration,
+        'render_seconds': elapsed,
+        'render_fps': writer.frames / elapsed if elapsed else 0.0,
+        'realtime_factor': duration / elapsed if elapsed else 0.0,
+    }
+
+
+def main(argv=None):
+    from styles import STYLES
+
+    parser = argparse.ArgumentParser(description="Render visualizer frames from an audio file, headless")
+    parser.add_argument('audio', help="input audio file (WAV natively, other formats via librosa)")
+    parser.add_argument('--style', type=int, default=1, choices=list(STYLES))
+    parser.add_argument('--fps', type=int, default=60)
+    parser.add_argument('--size', default='800x600', help="WIDTHxHEIGHT")
+    parser.add_argument('--seed', type=int, default=None, help="RNG seed for repeatable output")
+    parser.add_argument('--block-size', type=int, default=2048)
+    parser.add_argument('--out-dir', help="write numbered PNG frames here")
+    parser.add_argument('--raw', help="write a raw RGB24 frame stream to this file")
+    parser.add_argument('--max-frames', type=int, default=None)
+    parser.add_argument('--cache-dir', help="feature cache location (default ~/.cache/master-of-sound/features)")
+    parser.add_argument('--no-cache', action='store_true', help="analyse the audio live instead of caching features")
+    args = parser.parse_args(argv)
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    stats = render_file(args.audio, args.style, args.fps, width, height, args.seed,
+                        args.out_dir, args.raw, args.block_size, args.max_frames,
+                        args.cache_dir, not args.no_cache)
+    print(f"Rendered {stats['frames']} frames in {stats['render_seconds']:.2f}s "
+          f"after {stats['startup_seconds']:.2f}s of setup "
+          f"({stats['render_fps']:.1f} FPS, {stats['realtime_factor']:.2f}x real time)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
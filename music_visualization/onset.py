@@ -0,0 +1,135 @@
+import numpy as np
+
+
+class OnsetTracker:
+    """Streaming onset detection and tempo/beat tracking, O(1) per block.
+
+    Each analysed block contributes one spectral-flux value: the mean
+    positive difference of the log-compressed magnitude spectrum against the
+    previous block. An onset fires when the flux rises above an exponentially
+    weighted mean plus ``threshold`` standard deviations. The onset strength
+    feeds a leaky autocorrelation over the lags of ``min_bpm``..``max_bpm``,
+    whose weighted peak gives the tempo and, relative to lag 0, the
+    confidence. Beats are onsets near the expected beat time, or predicted
+    from the tempo when the music goes quiet. All state lives in preallocated
+    arrays; no history is ever re-analysed.
+    """
+
+    def __init__(self, n_bins: int, frame_rate: float, min_bpm: float = 60.0, max_bpm: float = 200.0,
+                 start_bpm: float = 120.0, threshold: float = 1.5, threshold_time: float = 1.0,
+                 acf_time: float = 8.0, min_interval: float = 0.1, min_confidence: float = 0.3,
+                 compression: float = 1000.0, floor: float = 1e-3):
+        self.n_bins = n_bins
+        self.frame_rate = frame_rate
+        self.threshold = threshold
+        self.min_confidence = min_confidence
+        self.compression = compression
+        self.floor = floor
+        self.min_interval = max(1, int(round(min_interval * frame_rate)))
+
+        self.min_lag = max(1, int(np.floor(frame_rate * 60 / max_bpm)))
+        self.max_lag = max(self.min_lag + 2, int(np.ceil(frame_rate * 60 / min_bpm)))
+        lags = np.arange(self.min_lag, self.max_lag + 1)
+        # Log-Gaussian tempo prior (one octave wide) to avoid octave errors
+        bpm = 60 * frame_rate / lags
+        self.prior = np.exp(-0.5 * np.log2(bpm / start_bpm) ** 2).astype(np.float64)
+        self._mean_decay = float(np.exp(-1.0 / (threshold_time * frame_rate)))
+        self._acf_decay = float(np.exp(-1.0 / (acf_time * frame_rate)))
+
+        self._log = np.zeros(n_bins, dtype=np.float32)
+        self._prev = np.zeros(n_bins, dtype=np.float32)
+        # Onset strength ring stored twice so the last max_lag+1 values are one slice
+        self._length = self.max_lag + 1
+        self._history = np.zeros(self._length * 2, dtype=np.float64)
+        self._scratch = np.zeros(self._length, dtype=np.float64)
+        self._weighted = np.zeros(len(lags), dtype=np.float64)
+        self.acf = np.zeros(self._length, dtype=np.float64)
+        self.reset()
+
+    def reset(self):
+        self._log[:] = 0
+        self._prev[:] = 0
+        self._history[:] = 0
+        self.acf[:] = 0
+        self._pos = 0
+        self._phase = 0.0
+        self._since_onset = self.min_interval
+        self.mean = 0.0
+        self.var = 0.0
+        self.flux = 0.0
+        self.strength = 0.0
+        self.onset = False
+        self.beat = False
+        self.beats = 0
+        self.confidence = 0.0
+        self.period = 60 * self.frame_rate / 120.0
+        self.tempo = 0.0
+
+    def update(self, magnitude: np.ndarray) -> bool:
+        """Feed one block's magnitude spectrum; returns True on a beat"""
+        # Spectral flux of the log-compressed spectrum
+        np.multiply(magnitude, self.compression, out=self._log)
+        np.log1p(self._log, out=self._log)
+        np.subtract(self._log, self._prev, out=self._prev)
+        np.maximum(self._prev, 0, out=self._prev)
+        flux = float(self._prev.sum()) / self.n_bins
+        self._log, self._prev = self._prev, self._log
+        self.flux = flux
+
+        # Adaptive threshold from an exponentially weighted mean/variance
+        deviation = flux - self.mean
+        limit = self.mean + self.threshold * np.sqrt(self.var)
+        self._since_onset += 1
+        self.onset = (flux > limit and flux > self.floor
+                      and self._since_onset >= self.min_interval)
+        if self.onset:
+            self._since_onset = 0
+        keep = self._mean_decay
+        self.mean += (1 - keep) * deviation
+        self.var = keep * (self.var + (1 - keep) * deviation * deviation)
+        self.strength = max(0.0, deviation)
+
+        # Leaky autocorrelation of the onset strength
+        pos = self._pos
+        self._history[pos] = self._history[pos + self._length] = self.strength
+        self._pos = (pos + 1) % self._length
+        recent = self._history[pos + 1:pos + 1 + self._length]
+        np.multiply(recent[::-1], (1 - self._acf_decay) * self.strength, out=self._scratch)
+        self.acf *= self._acf_decay
+        self.acf += self._scratch
+
+        # Tempo: weighted ACF peak, refined by parabolic interpolation
+        search = self.acf[self.min_lag:]
+        np.multiply(search, self.prior, out=self._weighted)
+        i = int(np.argmax(self._weighted))
+        lag = float(self.min_lag + i)
+        if 0 < i < len(search) - 1:
+            a, b, c = search[i - 1], search[i], search[i + 1]
+            denom = a - 2 * b + c
+            if denom < 0:
+                lag += 0.5 * (a - c) / denom
+        if self.acf[0] > 0:
+            self.confidence = float(min(1.0, search[i] / self.acf[0]))
+            self.period = lag
+            self.tempo = 60 * self.frame_rate / lag
+        else:
+            self.confidence = 0.0
+            self.tempo = 0.0
+
+        # Beats: onsets close to the expected time resync the phase; with a
+        # confident tempo the beat is also predicted through quiet passages
+        self._phase += 1
+        self.beat = False
+        if self.confidence < self.min_confidence:
+            if self.onset:
+                self.beat = True
+                self._phase = 0.0
+        elif self.onset and self._phase >= 0.75 * self.period:
+            self.beat = True
+            self._phase = 0.0
+        elif self._phase >= self.period:
+            self._phase -= self.period
+            self.beat = self.mean > self.floor
+        if self.beat:
+            self.beats += 1
+        return self.beat
@@ -0,0 +1,180 @@
+import numpy as np
+from typing import Dict, Tuple
+
+
+class ParticlePool:
+    """Structure-of-arrays storage for one visual style's elements.
+
+    Every pool owns preallocated ``pos``, ``velocity``, ``life``, ``size`` and
+    ``color`` arrays plus any extra per-element fields. Alive elements are kept
+    packed at the front of the arrays (indices ``0 .. count-1``); culling
+    compacts the survivors so each step is a handful of vectorized calls.
+    """
+
+    BASE_FIELDS = {
+        'pos': ((2,), np.float32),
+        'velocity': ((2,), np.float32),
+        'life': ((), np.float32),
+        'size': ((), np.float32),
+        'color': ((3,), np.float32),
+    }
+
+    def __init__(self, capacity: int, extra_fields: Dict[str, Tuple[tuple, type]] = None):
+        self.capacity = int(capacity)
+        self.count = 0
+        self.specs = dict(self.BASE_FIELDS)
+        if extra_fields:
+            self.specs.update(extra_fields)
+        self.fields = {}
+        for name, (shape, dtype) in self.specs.items():
+            self.fields[name] = np.zeros((self.capacity,) + shape, dtype=dtype)
+
+    def __len__(self):
+        return self.count
+
+    def __getattr__(self, name):
+        # Only called when normal lookup fails: expose alive views of fields
+        fields = self.__dict__.get('fields')
+        if fields is not None and name in fields:
+            return fields[name][:self.__dict__['count']]
+        raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        # ``pool.size += 1`` writes back into the alive slice, never rebinds
+        fields = self.__dict__.get('fields')
+        if fields is not None and name in fields:
+            fields[name][:self.count] = value
+        else:
+            object.__setattr__(self, name, value)
+
+    @property
+    def free(self) -> int:
+        return self.capacity - self.count
+
+    def resize(self, capacity: int):
+        """Change capacity, keeping as many alive elements as fit"""
+        capacity = int(capacity)
+        if capacity == self.capacity:
+            return
+        keep = min(self.count, capacity)
+        for name, arr in self.fields.items():
+            new_arr = np.zeros((capacity,) + arr.shape[1:], dtype=arr.dtype)
+            new_arr[:keep] = arr[:keep]
+            self.fields[name] = new_arr
+        self.capacity = capacity
+        self.count = keep
+
+    def clear(self):
+        self.count = 0
+
+    def spawn(self, n: int, **values) -> slice:
+        """Append up to ``n`` elements; values broadcast over the new slots.
+
+        Returns the slice of the newly spawned elements so callers can fill
+        fields that need per-element randomness.
+        """
+        n = max(0, min(int(n), self.free))
+        start = self.count
+        new = slice(start, start + n)
+        if n == 0:
+            return new
+        for name, arr in self.fields.items():
+            if name in values:
+                arr[new] = values[name]
+            else:
+                arr[new] = 0
+        self.count += n
+        return new
+
+    def integrate(self, dt: float = 1.0):
+        """Advance positions by velocity for all alive elements"""
+        n = self.count
+        if n:
+            pos = self.fields['pos'][:n]
+            pos += self.fields['velocity'][:n] * dt
+
+    def decay(self, rate: float):
+        """Reduce life of all alive elements"""
+        n = self.count
+        if n:
+            self.fields['life'][:n] -= rate
+
+    def cull(self, dead: np.ndarray = None):
+        """Remove elements with life <= 0 (or flagged in ``dead``) by compaction"""
+        n = self.count
+        if n == 0:
+            return
+        keep = self.fields['life'][:n] > 0
+        if dead is not None:
+            keep &= ~dead
+        alive = int(np.count_nonzero(keep))
+        if alive == n:
+            return
+        for arr in self.fields.values():
+            arr[:alive] = arr[:n][keep]
+        self.count = alive
+
+
+class HistoryRing:
+    """Fixed-size NumPy ring of equally shaped frames (e.g. wave polylines).
+
+    Pushing copies into the slot after the newest one, so appending never
+    shifts memory the way ``list.pop(0)`` does.
+    """
+
+    def __init__(self, capacity: int, frame_shape: tuple, dtype=np.int32):
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = dtype
+        self.capacity = int(capacity)
+        self.frames = np.zeros((self.capacity,) + self.frame_shape, dtype=dtype)
+        self.head = 0  # slot the next push writes to
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def push(self, frame: np.ndarray):
+        if np.shape(frame) != self.frame_shape:
+            # Band count changed: start a fresh history with the new shape
+            self.frame_shape = tuple(np.shape(frame))
+            self.frames = np.zeros((self.capacity,) + self.frame_shape, dtype=self.dtype)
+            self.head = self.count = 0
+        self.frames[self.head] = frame
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def replace_newest(self, frame: np.ndarray):
+        """Overwrite the newest frame in place (push if there is none yet)"""
+        if self.count == 0 or np.shape(frame) != self.frame_shape:
+            self.push(frame)
+            return
+        self.frames[(self.head - 1) % self.capacity] = frame
+
+    def newest(self):
+        if self.count == 0:
+            return None
+        return self.frames[(self.head - 1) % self.capacity]
+
+    def ordered(self):
+        """Frames from oldest to newest"""
+        start = (self.head - self.count) % self.capacity
+        for i in range(self.count):
+            yield self.frames[(start + i) % self.capacity]
+
+    def resize(self, capacity: int):
+        """Change capacity, keeping the newest frames"""
+        capacity = int(capacity)
+        if capacity == self.capacity:
+            return
+        keep = min(self.count, capacity)
+        frames = np.zeros((capacity,) + self.frame_shape, dtype=self.dtype)
+        if keep:
+            recent = list(self.ordered())[-keep:]
+            frames[:keep] = recent
+        self.frames = frames
+        self.capacity = capacity
+        self.count = keep
+        self.head = keep % capacity
+
+    def clear(self):
+        self.head = self.count = 0
@@ -0,0 +1,100 @@
+from collections import deque
+from typing import Dict
+
+import numpy as np
+
+
+# Fraction of each style's full-quality knob values at each level (0 = full)
+QUALITY_LEVELS = (1.0, 0.75, 0.5, 0.35, 0.25, 0.15)
+
+
+class QualityGovernor:
+    """Keeps frame work inside a target budget by scaling per-style knobs.
+
+    The governor watches the recent work time per frame (excluding the
+    ``clock.tick`` sleep). When the 90th percentile stays above the budget it
+    steps the active style down one quality level; when it stays well below
+    the budget for longer it steps back up. The two thresholds, the separate
+    patience counters and a cooldown after every change form the hysteresis
+    that keeps quality from oscillating. Levels are kept per style because
+    styles differ wildly in cost.
+    """
+
+    def __init__(self, target_fps: float = 60.0, window: int = 30,
+                 downgrade_ratio: float = 1.0, upgrade_ratio: float = 0.7,
+                 downgrade_frames: int = 15, upgrade_frames: int = 120, cooldown: int = 60,
+                 levels=QUALITY_LEVELS):
+        self.target_fps = target_fps
+        self.downgrade_ratio = downgrade_ratio
+        self.upgrade_ratio = upgrade_ratio
+        self.downgrade_frames = downgrade_frames
+        self.upgrade_frames = upgrade_frames
+        self.cooldown = cooldown
+        self.levels = tuple(levels)
+        self.enabled = True
+        self.frame_times = deque(maxlen=window)
+        self.style_levels: Dict[int, int] = {}
+        self._over = 0
+        self._under = 0
+        self._cooldown = 0
+
+    @property
+    def budget(self) -> float:
+        return 1.0 / self.target_fps
+
+    def level(self, style: int) -> int:
+        """Current quality level of ``style`` (0 is full quality)"""
+        return self.style_levels.get(style, 0)
+
+    def quality(self, style: int) -> float:
+        """Fraction of full quality applied to ``style``"""
+        return self.levels[self.level(style)]
+
+    def set_level(self, style: int, level: int):
+        self.style_levels[style] = max(0, min(len(self.levels) - 1, int(level)))
+        self.frame_times.clear()
+        self._over = self._under = 0
+        self._cooldown = self.cooldown
+
+    def reset(self):
+        """Forget history, e.g. after a style switch"""
+        self.frame_times.clear()
+        self._over = self._under = 0
+
+    def observe(self, style: int, work_time: float) -> bool:
+        """Feed one frame's work time; returns True if the level changed"""
+        if not self.enabled:
+            return False
+        self.frame_times.append(work_time)
+        if self._cooldown > 0:
+            self._cooldown -= 1
+            return False
+        if len(self.frame_times) < self.frame_times.maxlen:
+            return False
+
+        p90 = float(np.percentile(self.frame_times, 90))
+        level = self.level(style)
+        if p90 > self.budget * self.downgrade_ratio:
+            self._over += 1
+            self._under = 0
+        elif p90 < self.budget * self.upgrade_ratio:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = self._under = 0
+
+        if self._over >= self.downgrade_frames and level < len(self.levels) - 1:
+            self.set_level(style, level + 1)
+            return True
+        if self._under >= self.upgrade_frames and level > 0:
+            self.set_level(style, level - 1)
+            return True
+        return False
+
+    def status(self) -> dict:
+        recent = list(self.frame_times)
+        return {
+            'target_fps': self.target_fps,
+            'levels': {style: self.levels[level] for style, level in self.style_levels.items()},
+            'p90_ms': float(np.percentile(recent, 90) * 1000) if recent else 0.0,
+        }
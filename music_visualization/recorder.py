@@ -0,0 +1,132 @@
+import queue
+import threading
+import time
+
+import numpy as np
+import pygame
+
+from offline_render import FrameWriter
+
+
+class FrameRecorder:
+    """Records displayed frames without stalling the render loop.
+
+    ``capture()`` copies the surface's raw pixel rows into one of ``buffers``
+    preallocated arrays (a single memcpy) and hands its index to a writer
+    thread, which converts to RGB and writes PNGs or a raw RGB24 stream via
+    FrameWriter. The pool bounds the queue: when every buffer is waiting to be
+    written, policy 'drop' skips the frame and counts it, policy 'block' waits
+    for the writer (lossless, but the render loop slows to disk speed).
+    """
+
+    def __init__(self, size, out_dir: str = None, raw_path: str = None, buffers: int = 8,
+                 policy: str = 'drop'):
+        if policy not in ('drop', 'block'):
+            raise ValueError(f"Unknown record policy: {policy}")
+        self.size = (int(size[0]), int(size[1]))
+        self.out_dir = out_dir
+        self.raw_path = raw_path
+        self.policy = policy
+        self.captured = 0
+        self.dropped = 0
+        self.skipped = 0  # Frames of a different size (window resized)
+        self.written = 0
+        self.unwritten = 0  # Frames still queued when stop() gave up waiting
+        self.blocked_time = 0.0
+        self.max_queued = 0
+        self.error = None
+        self._layout = None
+        self._pool = None
+        self._buffers = buffers
+        self._free = queue.Queue()
+        self._filled = queue.Queue()
+        self._writer = FrameWriter(out_dir, raw_path)
+        # Not a daemon: exiting the interpreter must not cut a recording short
+        self._thread = threading.Thread(target=self._run, name="frame-recorder")
+        self._thread.start()
+
+    def _allocate(self, surface):
+        """Size the pool to the surface's pixel layout on the first frame"""
+        pitch = surface.get_pitch()
+        # Byte offsets of R, G and B within a (little-endian) pixel
+        self._layout = (surface.get_bytesize(), [shift // 8 for shift in surface.get_shifts()[:3]])
+        self._pool = [np.empty((self.size[1], pitch), dtype=np.uint8) for _ in range(self._buffers)]
+        for index in range(self._buffers):
+            self._free.put(index)
+
+    def capture(self, surface) -> bool:
+        """Queue a copy of ``surface``; returns False if the frame was dropped"""
+        if self.error is not None:
+            return False
+        if surface.get_size() != self.size:
+            self.skipped += 1
+            return False
+        if self._pool is None:
+            self._allocate(surface)
+        try:
+            if self.policy == 'drop':
+                index = self._free.get_nowait()
+            else:
+                start = time.perf_counter()
+                index = self._free.get()
+                self.blocked_time += time.perf_counter() - start
+        except queue.Empty:
+            self.dropped += 1
+            return False
+        buffer = self._pool[index]
+        view = surface.get_buffer()
+        np.copyto(buffer, np.frombuffer(view, dtype=np.uint8).reshape(buffer.shape))
+        del view  # Unlocks the surface
+        self.captured += 1
+        self._filled.put(index)
+        self.max_queued = max(self.max_queued, self._filled.qsize())
+        return True
+
+    def _run(self):
+        while True:
+            index = self._filled.get()
+            if index is None:
+                # Closed here, after the last write, never under a running writer
+                self._writer.close()
+                break
+            try:
+                bytesize, offsets = self._layout
+                width, height = self.size
+                pixels = self._pool[index][:, :width * bytesize].reshape(height, width, bytesize)
+                rgb = np.ascontiguousarray(pixels[..., offsets])  # RGB24
+                self._writer.write(pygame.image.frombuffer(rgb, self.size, 'RGB'))
+                self.written += 1
+            except Exception as e:
+                self.error = e
+            finally:
+                self._free.put(index)
+
+    def stop(self, timeout: float = 10.0) -> bool:
+        """Write out every queued frame and close the output.
+
+        Returns False if the writer is still busy after ``timeout``; it keeps
+        the output open until it finishes, and ``unwritten`` counts the frames
+        it had left.
+        """
+        self._filled.put(None)
+        self._thread.join(timeout)
+        self.unwritten = self.captured - self.written if self._thread.is_alive() else 0
+        return self.unwritten == 0
+
+    def finish(self):
+        """Wait, without a timeout, for a writer that stop() left running"""
+        self._thread.join()
+        self.unwritten = 0
+
+    def stats(self) -> dict:
+        return {
+            'captured': self.captured,
+            'written': self.written,
+            'dropped': self.dropped,
+            'unwritten': self.unwritten,
+            'skipped': self.skipped,
+            'queued': self._filled.qsize(),
+            'max_queued': self.max_queued,
+            'blocked_ms': round(self.blocked_time * 1000, 1),
+            'policy': self.policy,
+        }
@@ -0,0 +1,301 @@
+"""Audio capture and analysis in a separate process, published over shared memory.
+
+The analysis process owns the input stream, the ring buffer and the
+SpectrumAnalyzer, so FFT work never competes with the render loop for the
+GIL. Feature frames go into a small ring of slots in a
+``multiprocessing.shared_memory`` block. Each slot is guarded by sequence
+numbers written before and after the payload (a seqlock), and the render
+process only ever reads the newest complete frame.
+"""
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from audio_pipeline import FeatureSnapshot
+
+# Scalar features carried in every frame, in slot order
+SCALARS = ('timestamp', 'energy', 'onset', 'beat', 'beats', 'confidence', 'tempo', 'capture_time')
+
+# Header fields (int64)
+H_SEQ, H_STATE, H_RING_OVERFLOWS, H_UNDERRUNS, H_INPUT_OVERFLOWS, H_COST_NS, H_BLOCKS = range(7)
+HEADER_SIZE = 8
+
+STATE_STARTING, STATE_RUNNING, STATE_STOPPED, STATE_ERROR = range(4)
+
+
+def slot_dtype(n_bands: int, n_bins: int) -> np.dtype:
+    return np.dtype([
+        ('seq_begin', '<i8'),
+        ('scalars', '<f8', (len(SCALARS),)),
+        ('bands', '<f4', (n_bands,)),
+        ('spectrum', '<f4', (n_bins,)),
+        ('seq_end', '<i8'),
+    ])
+
+
+class SharedFeatureRing:
+    """Fixed ring of feature frames in shared memory (one writer, any readers)"""
+
+    def __init__(self, n_bands: int, n_bins: int, slots: int = 8, name: str = None, create: bool = True):
+        self.n_bands = n_bands
+        self.n_bins = n_bins
+        self.slots = slots
+        dtype = slot_dtype(n_bands, n_bins)
+        size = HEADER_SIZE * 8 + dtype.itemsize * slots
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        self.owner = create
+        self.header = np.ndarray((HEADER_SIZE,), dtype='<i8', buffer=self.shm.buf)
+        self.frames = np.ndarray((slots,), dtype=dtype, buffer=self.shm.buf, offset=HEADER_SIZE * 8)
+        if create:
+            self.header[:] = 0
+            self.frames['seq_begin'] = -1
+            self.frames['seq_end'] = -1
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def write(self, seq: int, scalars, bands: np.ndarray, spectrum: np.ndarray):
+        slot = self.frames[seq % self.slots]
+        slot['seq_begin'] = seq
+        slot['scalars'] = scalars
+        slot['bands'] = bands
+        slot['spectrum'] = spectrum
+        slot['seq_end'] = seq
+        self.header[H_SEQ] = seq
+
+    def read_latest(self, retries: int = 3):
+        """Copy of the newest complete frame, or None"""
+        for _ in range(retries):
+            seq = int(self.header[H_SEQ])
+            if seq <= 0:
+                return None
+            frame = self.frames[seq % self.slots].copy()
+            # A matching begin/end pair means the writer did not touch the slot mid-copy
+            if frame['seq_begin'] == seq and frame['seq_end'] == seq:
+                return seq, frame
+        return None
+
+    def close(self):
+        # Drop numpy views first so the buffer can be released
+        self.header = None
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _analysis_main(shm_name, n_bands, n_bins, slots, sample_rate, block_size, hop_size,
+                   device_block_size, latency, channels, parent_pid, stop_event, ready_event,
+                   errors, test_signal):
+    """Entry point of the analysis process"""
+    from audio_pipeline import AudioRingBuffer, capture_time
+    from spectrum import SpectrumAnalyzer
+
+    shared = SharedFeatureRing(n_bands, n_bins, slots, name=shm_name, create=False)
+    header = shared.header
+    stream = None
+    try:
+        analyzer = SpectrumAnalyzer(block_size, sample_rate, n_bands=n_bands, hop_size=hop_size)
+        ring = AudioRingBuffer(block_size * 16)
+        data_ready = threading.Event()
+        mix = np.zeros(max(block_size, device_block_size) * 4, dtype=np.float32)
+        input_latency = 0.0
+
+        def callback(indata, frames, time_info, status):
+            if status and getattr(status, 'input_overflow', False):
+                header[H_INPUT_OVERFLOWS] += 1
+            if indata.shape[1] > 1:
+                audio = np.mean(indata, axis=1, out=mix[:frames])
+            else:
+                audio = indata[:, 0]
+            ring.write(audio, capture_time(time_info, frames, sample_rate, input_latency))
+            data_ready.set()
+
+        if test_signal is None:
+            import sounddevice as sd
+            stream = sd.InputStream(callback=callback, channels=channels,
+                                    samplerate=sample_rate, blocksize=device_block_size,
+                                    latency=latency)
+            input_latency = stream.latency
+            stream.start()
+        else:
+            # Feed a prepared signal at real-time pace instead of a device
+            def play():
+                period = device_block_size / sample_rate
+                position = 0
+                while not stop_event.is_set():
+                    chunk = test_signal[position:position + device_block_size]
+                    if len(chunk) < device_block_size:
+                        position = 0
+                        continue
+                    callback(chunk[:, None], device_block_size, None, None)
+                    position += device_block_size
+                    time.sleep(period)
+            threading.Thread(target=play, daemon=True).start()
+
+        header[H_STATE] = STATE_RUNNING
+        ready_event.set()
+
+        block = np.zeros(block_size, dtype=np.float32)
+        seq = 0
+        timeout = hop_size / sample_rate * 2
+        scalars = np.zeros(len(SCALARS))
+        while not stop_event.is_set():
+            if os.getppid() != parent_pid:
+                break  # Render process died: don't linger holding the device
+            if not data_ready.wait(timeout):
+                header[H_UNDERRUNS] += 1
+                continue
+            data_ready.clear()
+            while ring.read_window(block, hop_size):
+                energy, magnitude, bands = analyzer.process(block)
+                onsets = analyzer.onsets
+                seq += 1
+                scalars[:] = (time.perf_counter(), energy, onsets.onset, onsets.beat,
+                              onsets.beats, onsets.confidence, onsets.tempo,
+                              ring.capture_time(ring.read_pos - hop_size, sample_rate))
+                shared.write(seq, scalars, bands, magnitude)
+            header[H_RING_OVERFLOWS] = ring.overflows
+            header[H_BLOCKS] = analyzer.blocks
+            header[H_COST_NS] = int(analyzer.total_time / max(1, analyzer.blocks) * 1e9)
+        header[H_STATE] = STATE_STOPPED
+    except BaseException as e:
+        header[H_STATE] = STATE_ERROR
+        errors.put(f"{type(e).__name__}: {e}")
+    finally:
+        if stream is not None:
+            stream.stop()
+            stream.close()
+        shared.close()
+
+
+class ProcessAnalysis:
+    """Render-side handle of the analysis process.
+
+    Mirrors AnalysisThread's interface (``latest``, ``underruns``, ``stop``),
+    so the render loop consumes snapshots the same way whichever path runs.
+    ``failed`` becomes True if the child dies; the caller can then fall back
+    to in-process analysis.
+    """
+
+    def __init__(self, sample_rate: int, block_size: int, channels: int = 1, n_bands: int = 100,
+                 slots: int = 8, test_signal: np.ndarray = None, hop_size: int = None,
+                 device_block_size: int = None, latency=None):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.hop_size = hop_size or block_size
+        self.device_block_size = device_block_size or self.hop_size
+        self.latency = latency
+        self.channels = channels
+        self.n_bands = n_bands
+        self.n_bins = block_size // 2 + 1
+        self.slots = slots
+        self.test_signal = test_signal
+        self.shared = None
+        self.process = None
+        self.error = None
+        self.failed = False
+        self._ctx = mp.get_context('spawn')  # forking a running SDL app is unsafe
+        self._stop_event = None
+        self._errors = None
+        self._last_seq = 0
+        self._latest = None
+        self._final_stats = {}
+
+    def start(self, timeout: float = 10.0):
+        """Spawn the analysis process and wait until its stream is running"""
+        self.shared = SharedFeatureRing(self.n_bands, self.n_bins, self.slots)
+        self._stop_event = self._ctx.Event()
+        ready = self._ctx.Event()
+        self._errors = self._ctx.Queue()
+        self.process = self._ctx.Process(
+            target=_analysis_main, name="audio-analysis",
+            args=(self.shared.name, self.n_bands, self.n_bins, self.slots, self.sample_rate,
+                  self.block_size, self.hop_size, self.device_block_size, self.latency,
+                  self.channels, os.getpid(), self._stop_event, ready, self._errors,
+                  self.test_signal),
+            daemon=True)
+        self.process.start()
+        deadline = time.monotonic() + timeout
+        while not ready.wait(0.05):
+            if not self.process.is_alive() or time.monotonic() > deadline:
+                self._mark_failed("analysis process did not start")
+                self.stop()
+                raise RuntimeError(self.error)
+
+    def _mark_failed(self, default: str):
+        self.failed = True
+        try:
+            self.error = self._errors.get_nowait()
+        except (queue.Empty, OSError, ValueError):
+            self.error = default
+
+    def check(self) -> bool:
+        """True while the child is healthy; records the failure otherwise"""
+        if self.failed:
+            return False
+        if self.process is None or not self.process.is_alive() \
+                or self.shared.header[H_STATE] == STATE_ERROR:
+            self._mark_failed(f"analysis process exited (code {self.process.exitcode})")
+            return False
+        return True
+
+    @property
+    def latest(self):
+        if self.shared is None or self.failed:
+            return self._latest
+        result = self.shared.read_latest()
+        if result is None:
+            return self._latest
+        seq, frame = result
+        if seq != self._last_seq:
+            self._last_seq = seq
+            scalars = dict(zip(SCALARS, frame['scalars'].tolist()))
+            spectrum = frame['spectrum']
+            bands = frame['bands']
+            spectrum.flags.writeable = False
+            bands.flags.writeable = False
+            self._latest = FeatureSnapshot(seq, scalars['timestamp'], scalars['energy'],
+                                           spectrum, bands, bool(scalars['onset']),
+                                           bool(scalars['beat']), int(scalars['beats']),
+                                           scalars['confidence'], scalars['tempo'],
+                                           scalars['capture_time'])
+        return self._latest
+
+    @property
+    def underruns(self) -> int:
+        return int(self.shared.header[H_UNDERRUNS]) if self.shared is not None else 0
+
+    def stats(self) -> dict:
+        if self.shared is None:
+            return dict(self._final_stats)
+        header = self.shared.header
+        return {
+            'process_ring_overflows': int(header[H_RING_OVERFLOWS]),
+            'process_input_overflows': int(header[H_INPUT_OVERFLOWS]),
+            'process_blocks': int(header[H_BLOCKS]),
+            'process_cost_us': int(header[H_COST_NS]) / 1000,
+        }
+
+    def stop(self, timeout: float = 2.0):
+        """Ask the child to stop, then escalate; always releases shared memory"""
+        if self.process is not None:
+            self._stop_event.set()
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(timeout)
+            self.process = None
+        if self.shared is not None:
+            self._final_stats = self.stats()
+            self.shared.close()
+            self.shared = None
@@ -0,0 +1,145 @@
+import time
+
+import numpy as np
+
+from audio_pipeline import FeatureSnapshot
+from onset import OnsetTracker
+
+
+def _rfft_supports_out() -> bool:
+    # ``out=`` for numpy.fft arrived in NumPy 2.0
+    try:
+        np.fft.rfft(np.zeros(4), out=np.zeros(3, dtype=np.complex128))
+        return True
+    except TypeError:
+        return False
+
+
+RFFT_HAS_OUT = _rfft_supports_out()
+
+
+def log_band_matrix(n_bands: int, block_size: int, sample_rate: int,
+                    fmin: float = 40.0, fmax: float = None) -> np.ndarray:
+    """Matrix that averages rfft bins into ``n_bands`` log-spaced bands"""
+    fmax = fmax or sample_rate / 2
+    freqs = np.fft.rfftfreq(block_size, 1.0 / sample_rate)
+    edges = np.geomspace(fmin, fmax, n_bands + 1)
+    matrix = np.zeros((n_bands, len(freqs)), dtype=np.float32)
+    for band in range(n_bands):
+        lo, hi = edges[band], edges[band + 1]
+        in_band = (freqs >= lo) & (freqs < hi)
+        if not in_band.any():
+            # Low bands are narrower than one bin: use the nearest bin
+            in_band[np.argmin(np.abs(freqs - np.sqrt(lo * hi)))] = True
+        matrix[band, in_band] = 1.0 / np.count_nonzero(in_band)
+    return matrix
+
+
+class SpectrumAnalyzer:
+    """Windowed real-FFT analysis of fixed-size blocks into log bands.
+
+    Everything that depends only on the block size is computed once: the Hann
+    window, the bin-to-band matrix and all intermediate buffers. Per block the
+    work is a window multiply, one ``rfft``, a magnitude, a matrix product and
+    a vectorized attack/release smoothing of the bands, plus one O(1) step of
+    the onset/beat tracker. Calling the analyzer returns a FeatureSnapshot, so
+    it plugs straight into AnalysisThread.
+    """
+
+    def __init__(self, block_size: int = 2048, sample_rate: int = 44100,
+                 n_bands: int = 100, fmin: float = 40.0, fmax: float = None,
+                 attack: float = 0.6, release: float = 0.15, hop_size: int = None):
+        self.block_size = block_size
+        self.hop_size = hop_size or block_size
+        self.sample_rate = sample_rate
+        self.n_bands = n_bands
+        # attack/release are per window; overlapping hops get the per-hop
+        # equivalent so smoothing keeps the same time constant
+        steps = self.hop_size / block_size
+        self.attack = 1 - (1 - attack) ** steps
+        self.release = 1 - (1 - release) ** steps
+
+        self.window = np.hanning(block_size).astype(np.float32)
+        # Scale so a full-scale sine reads ~1.0, like the old |fft| / (N/2)
+        self.scale = np.float32(2.0 / self.window.sum())
+        self.band_matrix = log_band_matrix(n_bands, block_size, sample_rate, fmin, fmax)
+
+        n_bins = block_size // 2 + 1
+        self._windowed = np.zeros(block_size, dtype=np.float32)
+        self._fft = np.zeros(n_bins, dtype=np.complex128)
+        self._magnitude = np.zeros(n_bins, dtype=np.float32)
+        self._raw_bands = np.zeros(n_bands, dtype=np.float32)
+        self._bands = np.zeros(n_bands, dtype=np.float32)
+        self._diff = np.zeros(n_bands, dtype=np.float32)
+        self._rate = np.zeros(n_bands, dtype=np.float32)
+        self._rising = np.zeros(n_bands, dtype=bool)
+        self._points_x = None
+        self._points = None
+        self.onsets = OnsetTracker(n_bins, sample_rate / self.hop_size)
+
+        # Cost accounting
+        self.blocks = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def process(self, block: np.ndarray):
+        """Analyze one block in place; returns (energy, magnitude, bands)"""
+        start = time.perf_counter()
+
+        energy = float(np.abs(block).mean())
+        np.multiply(block, self.window, out=self._windowed)
+        if RFFT_HAS_OUT:
+            np.fft.rfft(self._windowed, out=self._fft)
+        else:
+            self._fft[:] = np.fft.rfft(self._windowed)
+        np.abs(self._fft, out=self._magnitude, casting='same_kind')
+        self._magnitude *= self.scale
+        np.matmul(self.band_matrix, self._magnitude, out=self._raw_bands)
+
+        # Fast attack, slow release
+        np.subtract(self._raw_bands, self._bands, out=self._diff)
+        np.greater(self._diff, 0, out=self._rising)
+        np.copyto(self._rate, self.release)
+        self._rate[self._rising] = self.attack
+        self._diff *= self._rate
+        self._bands += self._diff
+        self.onsets.update(self._magnitude)
+
+        elapsed = time.perf_counter() - start
+        self.blocks += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        return energy, self._magnitude, self._bands
+
+    def __call__(self, block: np.ndarray, seq: int, capture_time: float = 0.0) -> FeatureSnapshot:
+        energy, magnitude, bands = self.process(block)
+        spectrum = magnitude.copy()
+        spectrum.flags.writeable = False
+        bands = bands.copy()
+        bands.flags.writeable = False
+        onsets = self.onsets
+        return FeatureSnapshot(seq, time.perf_counter(), energy, spectrum, bands,
+                               onsets.onset, onsets.beat, onsets.beats,
+                               onsets.confidence, onsets.tempo, capture_time)
+
+    def points(self, bands: np.ndarray, width: int, height: int) -> np.ndarray:
+        """Polyline points (n_bands x 2, int) spanning the window width"""
+        if self._points_x is None or self._points.shape[0] != len(bands) or self._points_width != width:
+            self._points_width = width
+            self._points_x = np.linspace(0, width, len(bands), endpoint=False).astype(np.int32)
+            self._points = np.zeros((len(bands), 2), dtype=np.int32)
+            self._points[:, 0] = self._points_x
+        np.multiply(bands, height * 2, out=self._points[:, 1], casting='unsafe')
+        self._points[:, 1] += height // 2
+        return self._points
+
+    def stats(self) -> dict:
+        """Per-block cost compared with the hop period"""
+        mean = self.total_time / self.blocks if self.blocks else 0.0
+        period = self.hop_size / self.sample_rate
+        return {
+            'blocks': self.blocks,
+            'mean_us': mean * 1e6,
+            'max_us': self.max_time * 1e6,
+            'budget_fraction': mean / period,
+        }
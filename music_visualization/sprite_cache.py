@@ -0,0 +1,61 @@
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+import pygame
+
+
+class SpriteCache:
+    """Bounded LRU cache of pre-rendered surfaces.
+
+    Surfaces are accounted by their pixel memory; when the total goes over
+    ``max_bytes`` the least recently used sprites are evicted. Hit, miss and
+    eviction counters make it possible to size the cache for long sets.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = int(max_bytes)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._sprites = OrderedDict()
+
+    def __len__(self):
+        return len(self._sprites)
+
+    @staticmethod
+    def surface_bytes(surface: pygame.Surface) -> int:
+        return surface.get_pitch() * surface.get_height()
+
+    def get(self, key: Hashable, render: Callable[[], pygame.Surface]) -> pygame.Surface:
+        """Return the sprite for ``key``, rendering it on a miss"""
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+            self.hits += 1
+            return sprite
+        self.misses += 1
+        sprite = render()
+        self._sprites[key] = sprite
+        self.bytes += self.surface_bytes(sprite)
+        while self.bytes > self.max_bytes and len(self._sprites) > 1:
+            _, old = self._sprites.popitem(last=False)
+            self.bytes -= self.surface_bytes(old)
+            self.evictions += 1
+        return sprite
+
+    def clear(self):
+        self._sprites.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'sprites': len(self._sprites),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,595 @@
+import math
+from typing import Dict
+
+import numpy as np
+import pygame
+
+from particle_pool import HistoryRing, ParticlePool
+from sprite_cache import SpriteCache
+
+
+def circle_rect(x, y, radius):
+    """Bounding box of a circle, padded for antialiasing and line width"""
+    r = int(radius) + 2
+    return (x - r, y - r, 2 * r + 1, 2 * r + 1)
+
+
+def points_rect(points, width):
+    """Bounding box of a polyline or polygon"""
+    lo = np.min(points, axis=0)
+    hi = np.max(points, axis=0)
+    pad = int(width) + 1
+    return (int(lo[0]) - pad, int(lo[1]) - pad,
+            int(hi[0] - lo[0]) + 2 * pad + 1, int(hi[1] - lo[1]) + 2 * pad + 1)
+
+
+class Style:
+    """One visual style: owns its elements and implements the hooks below.
+
+    Only the active style is spawned into, updated and drawn. When another
+    style takes over, ``suspend()`` frees the canvas-sized surfaces but keeps
+    the elements frozen, so switching back resumes where it left off;
+    ``release()`` drops everything so the style is rebuilt on next use.
+    Subclasses register with ``@STYLES.register`` and need no changes to the
+    main loop.
+    """
+
+    number = 0
+    name = ""
+    color = (128, 128, 128)     # Style bar button colour
+    element_name = "elements"   # Label of element_count() in the HUD and logs
+    limit = None                # Knob holding the element limit (benchmark sweeps it)
+    beat_burst = 0              # Extra elements per detected beat at full confidence
+    quality_knobs: Dict[str, float] = {}  # Knobs the governor scales, at full quality
+
+    def __init__(self, viz):
+        self.viz = viz
+        self.spawn_scale = 1.0
+        for name, value in self.quality_knobs.items():
+            setattr(self, name, value)
+
+    # Hooks
+
+    def spawn(self, snapshot, count: int):
+        """Add elements for new audio features (``count`` at the current spawn rate)"""
+
+    def update(self):
+        """Advance the simulation one frame"""
+
+    def draw(self):
+        """Draw onto ``viz.canvas``"""
+
+    def resize(self):
+        """The window size changed"""
+
+    def suspend(self):
+        """Another style became active: freeze and drop per-frame surfaces"""
+        self.viz.compositor.release(self.number)
+        self.viz.trails.pop(self.number, None)
+
+    def release(self):
+        """The style is being dropped; it is recreated if selected again.
+
+        Element pools go with the instance; override to free anything held
+        outside it.
+        """
+        self.suspend()
+
+    def element_count(self) -> int:
+        return 0
+
+    def stats(self) -> dict:
+        return {}
+
+    # Quality
+
+    def apply_quality(self, quality: float):
+        """Set every knob to ``quality`` x its full-quality value"""
+        for name, full in self.quality_knobs.items():
+            if isinstance(full, int):
+                value = max(1, int(full * quality))
+            else:
+                value = full * quality
+            setattr(self, name, value)
+
+    @staticmethod
+    def _sync_capacity(pool, limit):
+        """Resize a pool when its max_* setting has been changed"""
+        if pool.capacity != limit:
+            pool.resize(limit)
+
+
+class StyleRegistry:
+    """Style classes by number, in button order"""
+
+    def __init__(self):
+        self.classes = {}
+
+    def register(self, cls):
+        self.classes[cls.number] = cls
+        return cls
+
+    def __contains__(self, number):
+        return number in self.classes
+
+    def __getitem__(self, number):
+        return self.classes[number]
+
+    def __iter__(self):
+        return iter(sorted(self.classes))
+
+    def __len__(self):
+        return len(self.classes)
+
+    def names(self) -> dict:
+        return {number: self.classes[number].name for number in self}
+
+
+STYLES = StyleRegistry()
+
+
+@STYLES.register
+class PulseParticles(Style):
+    number = 1
+    name = "Pulse Particles"
+    color = (255, 89, 94)
+    element_name = "particles"
+    limit = 'max_particles'
+    beat_burst = 12
+    quality_knobs = {'max_particles': 150, 'spawn_scale': 1.0}
+
+    pulse_radius = 50
+    pulse_speed = 2
+
+    def __init__(self, viz):
+        super().__init__(viz)
+        self.particles = ParticlePool(self.max_particles)
+
+    def create(self, energy, count=1):
+        """Spawn new particles with pulse effect"""
+        viz = self.viz
+        self._sync_capacity(self.particles, self.max_particles)
+        intensity = min(1.0, energy * 10)
+        color1 = np.array([255, 89, 94])  # Coral red
+        color2 = np.array([255, 202, 58])  # Warm yellow
+        new = self.particles.spawn(count,
+                                   pos=(viz.width/2, viz.height/2),
+                                   size=self.pulse_radius,
+                                   color=color1 * (1 - intensity) + color2 * intensity,
+                                   life=1.0)
+        n = new.stop - new.start
+        if n:
+            angle = viz.rng.random(n) * 2 * np.pi
+            speed = self.pulse_speed * (0.5 + energy * 5)
+            velocity = self.particles.fields['velocity'][new]
+            velocity[:, 0] = np.cos(angle) * speed
+            velocity[:, 1] = np.sin(angle) * speed
+        return new
+
+    def spawn(self, snapshot, count):
+        self.create(snapshot.energy, count)
+
+    def update(self):
+        particles = self.particles
+        particles.integrate()
+        particles.size[:] += self.pulse_speed
+        particles.decay(0.01)
+        particles.cull()
+
+    def draw(self):
+        viz = self.viz
+        particles = self.particles
+        scale = viz.render_scale
+        line_width = max(1, round(2 * scale))
+        if viz.raster_mode:
+            # All rings in one vectorized batch
+            viz.raster.rings(particles.pos * scale, particles.size * scale, particles.color,
+                             particles.life, line_width)
+            viz.raster.draw(viz.canvas)
+            return
+
+        compositor = viz.compositor
+        compositor.begin(self.number)
+        alphas = (255 * particles.life).astype(int)
+        for (x, y), radius, color, alpha in zip((particles.pos * scale).astype(int).tolist(),
+                                                (particles.size * scale).astype(int).tolist(),
+                                                particles.color.astype(int).tolist(),
+                                                alphas.tolist()):
+            s = compositor.element(circle_rect(x, y, radius))
+            pygame.draw.circle(s, (*color, alpha), (x, y), radius, line_width)
+            compositor.commit()
+        compositor.end(viz.canvas)
+
+    def element_count(self):
+        return len(self.particles)
+
+
+@STYLES.register
+class WaveLines(Style):
+    number = 2
+    name = "Wave Lines"
+    color = (45, 149, 150)
+    element_name = "waves"
+    limit = 'max_wave_history'
+    quality_knobs = {'max_wave_history': 50}
+
+    line_color = (100, 200, 255)
+
+    def __init__(self, viz):
+        super().__init__(viz)
+        self.history = HistoryRing(self.max_wave_history, (viz.spectrum_analyzer.n_bands, 2))
+
+    def spawn(self, snapshot, count):
+        viz = self.viz
+        points = viz.spectrum_analyzer.points(snapshot.bands, viz.width, viz.height)
+        if len(points) <= 1:  # Only add if we have valid points
+            return
+        if self.history.capacity != self.max_wave_history:
+            self.history.resize(self.max_wave_history)
+        # A new line per block of audio keeps the history (and trail) the same
+        # length in seconds whatever the hop; with overlapping hops the newest
+        # line follows every hop in between, so it reacts at hop latency
+        if count > 0:
+            self.history.push(points)
+        else:
+            self.history.replace_newest(points)
+
+    def draw(self):
+        viz = self.viz
+        line_width = max(1, round(2 * viz.render_scale))
+        if viz.trail_mode:
+            trail = viz.trail(self.number, self.max_wave_history)
+            newest = self.history.newest()
+            if newest is not None:
+                pygame.draw.lines(trail.surface, (*self.line_color, 255), False,
+                                  viz.to_canvas(newest), line_width)
+            trail.draw(viz.canvas)
+            return
+
+        compositor = viz.compositor
+        compositor.begin(self.number)
+        for i, points in enumerate(self.history.ordered()):
+            alpha = int(255 * (i / len(self.history)))
+            points = viz.to_canvas(points)
+            s = compositor.element(points_rect(points, line_width))
+            pygame.draw.lines(s, (*self.line_color, alpha), False, points, line_width)
+            compositor.commit()
+        compositor.end(viz.canvas)
+
+    def resize(self):
+        # Points are in old window coordinates
+        self.history.clear()
+
+    def element_count(self):
+        return len(self.history)
+
+
+@STYLES.register
+class StarField(Style):
+    number = 3
+    name = "Star Field"
+    color = (132, 94, 194)
+    element_name = "stars"
+    limit = 'max_stars'
+    beat_burst = 6
+    quality_knobs = {'max_stars': 200, 'star_glow_layers': 5, 'spawn_scale': 1.0}
+
+    star_pulse_speed = 0.1  # 脉动速度
+    # Sprites are keyed on quantized (size, color, alpha)
+    star_size_step = 0.5
+    star_transition_levels = 16
+    star_alpha_step = 8
+
+    def __init__(self, viz):
+        super().__init__(viz)
+        self.stars = ParticlePool(self.max_stars, {
+            'brightness': ((), np.float32),
+            'transition': ((), np.float32),
+            'pulse_phase': ((), np.float32),
+        })
+        # Pre-rendered glow/ray sprites
+        self.sprites = SpriteCache(max_bytes=32 * 1024 * 1024)
+
+    def apply_quality(self, quality):
+        super().apply_quality(quality)
+        self.star_glow_layers = max(1, round(self.quality_knobs['star_glow_layers'] * quality))
+
+    def create(self, energy, count=1):
+        """Spawn new stars"""
+        viz = self.viz
+        self._sync_capacity(self.stars, self.max_stars)
+        # 在紫色和白色之间过渡
+        # 紫色基础：RGB(147, 112, 219)
+        # 白色：RGB(255, 255, 255)
+        purple = np.array([147, 112, 219])
+        white = np.array([255, 255, 255])
+
+        # 根据能量在紫色和白色之间插值
+        transition = min(1.0, energy * 3)  # 能量大时更偏向白色
+
+        # 星星大小和速度都受能量影响
+        new = self.stars.spawn(count,
+                               size=max(4, min(15, energy * 60)),  # 更大的尺寸范围
+                               brightness=min(255, energy * 2000),
+                               color=purple * (1 - transition) + white * transition,
+                               transition=transition,
+                               life=1.0)
+        n = new.stop - new.start
+        if n:
+            # 根据能量决定星星出现的位置（能量大时更集中在中心）
+            spread = max(0.2, 1.0 - energy * 2)  # 能量越大，spread越小
+            pos = self.stars.fields['pos'][new]
+            pos[:, 0] = viz.width/2 + (viz.rng.random(n) - 0.5) * viz.width * spread
+            pos[:, 1] = viz.height/2 + (viz.rng.random(n) - 0.5) * viz.height * spread
+
+            speed = energy * 5  # 移动速度随能量变化
+            angle = viz.rng.random(n) * 2 * np.pi
+            velocity = self.stars.fields['velocity'][new]
+            velocity[:, 0] = np.cos(angle) * speed
+            velocity[:, 1] = np.sin(angle) * speed
+            self.stars.fields['pulse_phase'][new] = viz.rng.random(n) * 2 * np.pi  # 用于制造脉动效果
+        return new
+
+    def spawn(self, snapshot, count):
+        self.create(snapshot.energy, count)
+
+    def update(self):
+        stars = self.stars
+        stars.integrate()
+        pos = stars.pos
+        np.mod(pos[:, 0], self.viz.width, out=pos[:, 0])
+        np.mod(pos[:, 1], self.viz.height, out=pos[:, 1])
+        stars.pulse_phase[:] += self.star_pulse_speed  # 更新脉动相位
+        stars.decay(0.005)
+        stars.cull()
+
+    def render_sprite(self, current_size, transition, alpha, glow_layers):
+        """Pre-render one star's multi-layer glow and cross rays"""
+        purple = np.array([147, 112, 219])
+        white = np.array([255, 255, 255])
+        color = tuple(int(c) for c in purple * (1 - transition) + white * transition)
+
+        r = int(current_size * 3 + current_size / 3) + 2
+        sprite = pygame.Surface((2 * r + 1, 2 * r + 1), pygame.SRCALPHA)
+        layer = pygame.Surface(sprite.get_size(), pygame.SRCALPHA)
+
+        # 创建发光效果，外层光晕最先绘制
+        size_mults = [3.0, 2.5, 2.0, 1.5, 1.0][-glow_layers:]
+        for size_mult in size_mults:
+            layer_alpha = int(alpha * (0.2 if size_mult > 1 else 1.0))
+            layer.fill((0, 0, 0, 0))
+            pygame.draw.circle(layer, (*color, layer_alpha), (r, r), int(current_size * size_mult))
+
+            # 在最外层添加十字光芒
+            if size_mult == size_mults[0]:
+                ray_length = current_size * 3
+                ray_width = max(1, current_size / 3)
+                ray_color = (*color, layer_alpha // 2)
+
+                # 绘制四个方向的光芒
+                for angle in [0, 45, 90, 135]:
+                    rad = math.radians(angle)
+                    dx = math.cos(rad) * ray_length
+                    dy = math.sin(rad) * ray_length
+                    pygame.draw.line(layer,
+                                     ray_color,
+                                     (int(r - dx), int(r - dy)),
+                                     (int(r + dx), int(r + dy)),
+                                     int(ray_width))
+            sprite.blit(layer, (0, 0))
+        return sprite
+
+    def draw(self):
+        viz = self.viz
+        stars = self.stars
+        glow_layers = self.star_glow_layers
+        scale = viz.render_scale
+        pulse = np.sin(stars.pulse_phase) * (0.3 * scale) + scale
+        if viz.raster_mode:
+            self.draw_raster(viz.raster, stars.pos * scale, stars.size * pulse, glow_layers)
+            viz.raster.draw(viz.canvas)
+            return
+
+        compositor = viz.compositor
+        layer = compositor.begin(self.number)
+        cache = self.sprites
+
+        # 量化尺寸、颜色和透明度，使精灵可以复用
+        size_q = np.round(stars.size * pulse / self.star_size_step).astype(int)
+        levels = self.star_transition_levels
+        transition_q = np.round(stars.transition * levels).astype(int)
+        alpha_q = np.round(stars.brightness * stars.life / self.star_alpha_step).astype(int)
+
+        blits = []
+        for (x, y), sq, tq, aq in zip((stars.pos * scale).astype(int).tolist(),
+                                      size_q.tolist(),
+                                      transition_q.tolist(),
+                                      alpha_q.tolist()):
+            if aq <= 0:
+                continue
+            key = (sq, tq, aq, glow_layers)
+            sprite = cache.get(key, lambda: self.render_sprite(
+                sq * self.star_size_step, tq / levels,
+                min(255, aq * self.star_alpha_step), glow_layers))
+            r = sprite.get_width() // 2
+            blits.append((sprite, (x - r, y - r)))
+
+        for rect in layer.blits(blits):
+            compositor.mark(rect)
+        compositor.end(viz.canvas)
+
+    def draw_raster(self, raster, pos, size, glow_layers):
+        """Approximate render_sprite for all stars at once.
+
+        Glows cost the same for any size, so the body is a soft glow plus a
+        small crisp centre; the per-pixel rays only at higher quality levels.
+        """
+        stars = self.stars
+        alpha = np.minimum(255, stars.brightness * stars.life) / 255
+        if glow_layers > 1:
+            # Outer layers (0.2 alpha each, out to 3x size) become one soft glow
+            raster.glows(pos, size * 3, stars.color, alpha * 0.2 * (glow_layers - 1))
+        if glow_layers >= 3:
+            # Rays are drawn at half the outermost layer's alpha
+            raster.rays(pos, size, stars.color, alpha * 0.1)
+        raster.glows(pos, size, stars.color, alpha)
+        raster.discs(pos, np.minimum(size / 3, 2), stars.color, alpha)
+
+    def element_count(self):
+        return len(self.stars)
+
+    def stats(self):
+        return {'sprite_cache': self.sprites.stats()}
+
+
+@STYLES.register
+class GeometricShapes(Style):
+    number = 4
+    name = "Geometric Shapes"
+    color = (255, 170, 51)
+    element_name = "shapes"
+    limit = 'max_shapes'
+    beat_burst = 3
+    quality_knobs = {'max_shapes': 10, 'spawn_scale': 1.0}
+
+    def __init__(self, viz):
+        super().__init__(viz)
+        self.shapes = ParticlePool(self.max_shapes, {
+            'sides': ((), np.int8),
+            'rotation': ((), np.float32),
+            'rotation_speed': ((), np.float32),
+        })
+
+    def create(self, energy, count=1):
+        """Spawn new geometric shapes"""
+        viz = self.viz
+        self._sync_capacity(self.shapes, self.max_shapes)
+        new = self.shapes.spawn(count, size=40 + energy * 200, life=1.0)  # 增大基础大小和能量影响
+        n = new.stop - new.start
+        if n:
+            # 三角形、正方形、五边形
+            self.shapes.fields['sides'][new] = viz.rng.integers(3, 6, n)
+            # 在屏幕范围内随机位置
+            pos = self.shapes.fields['pos'][new]
+            pos[:, 0] = viz.width/2 + viz.rng.integers(-200, 200, n)
+            pos[:, 1] = viz.height/2 + viz.rng.integers(-150, 150, n)
+
+            # 生成明亮的颜色（HSV: s=0.8, v=1.0）
+            hue = viz.rng.random(n)  # 随机色相
+            k = (np.array([5.0, 3.0, 1.0]) + hue[:, None] * 6) % 6
+            rgb = 1.0 - 0.8 * np.clip(np.minimum(k, 4 - k), 0, 1)
+            self.shapes.fields['color'][new] = (rgb * 255).astype(int)
+
+            self.shapes.fields['rotation'][new] = viz.rng.random(n) * 360
+            self.shapes.fields['rotation_speed'][new] = viz.rng.random(n) * 4 - 2  # 随机旋转速度
+        return new
+
+    def spawn(self, snapshot, count):
+        self.create(snapshot.energy, count)
+
+    def update(self):
+        shapes = self.shapes
+        shapes.rotation[:] += shapes.rotation_speed  # 使用独立的旋转速度
+        shapes.size[:] *= 0.99  # 降低缩小速度
+        shapes.decay(0.008)  # 延长生命周期
+        shapes.cull(shapes.size < 10)
+
+    def draw(self):
+        viz = self.viz
+        shapes = self.shapes
+        compositor = viz.compositor
+        compositor.begin(self.number)
+        scale = viz.render_scale
+        for (cx, cy), sides, rotation, size, color, life in zip((shapes.pos * scale).tolist(),
+                                                                shapes.sides.tolist(),
+                                                                shapes.rotation.tolist(),
+                                                                (shapes.size * scale).tolist(),
+                                                                shapes.color.astype(int).tolist(),
+                                                                shapes.life.tolist()):
+            points = []
+            for i in range(sides):
+                angle = math.radians(rotation + (360 / sides) * i)
+                x = cx + math.cos(angle) * size
+                y = cy + math.sin(angle) * size
+                points.append((int(x), int(y)))  # Convert to integers
+            s = compositor.element(points_rect(points, 1))
+            pygame.draw.polygon(s, (*color, int(255 * life)), points)
+            compositor.commit()
+        compositor.end(viz.canvas)
+
+    def element_count(self):
+        return len(self.shapes)
+
+
+@STYLES.register
+class FluidRipples(Style):
+    number = 5
+    name = "Fluid Ripples"
+    color = (29, 185, 84)
+    element_name = "ripples"
+    limit = 'max_ripples'
+    beat_burst = 2
+    quality_knobs = {'max_ripples': 20, 'spawn_scale': 1.0}
+
+    ripple_color = (0, 150, 255)
+    ripple_width = 2
+    trail_history = 50  # Trail length in audio blocks, like Wave Lines
+
+    def __init__(self, viz):
+        super().__init__(viz)
+        self.ripples = ParticlePool(self.max_ripples, {
+            'max_radius': ((), np.float32),
+        })
+
+    def create(self, energy, count=1):
+        """Spawn new ripples"""
+        viz = self.viz
+        self._sync_capacity(self.ripples, self.max_ripples)
+        new = self.ripples.spawn(count,
+                                 size=5,
+                                 max_radius=100 + energy * 200,
+                                 color=self.ripple_color,
+                                 life=1.0)
+        n = new.stop - new.start
+        if n:
+            pos = self.ripples.fields['pos'][new]
+            pos[:, 0] = viz.width/2 + viz.rng.integers(-100, 100, n)
+            pos[:, 1] = viz.height/2 + viz.rng.integers(-100, 100, n)
+        return new
+
+    def spawn(self, snapshot, count):
+        self.create(snapshot.energy, count)
+
+    def update(self):
+        ripples = self.ripples
+        np.minimum(ripples.size + 2, ripples.max_radius, out=ripples.size)
+        ripples.decay(0.01)
+        ripples.cull()
+
+    def draw(self):
+        viz = self.viz
+        ripples = self.ripples
+        scale = viz.render_scale
+        line_width = max(1, round(self.ripple_width * scale))
+        centers = (ripples.pos * scale).astype(int).tolist()
+        radii = (ripples.size * scale).astype(int).tolist()
+        alphas = (255 * ripples.life).astype(int)
+        if viz.trail_mode:
+            # Only the current rings are drawn; older positions fade in the buffer
+            trail = viz.trail(self.number, self.trail_history)
+            for (x, y), radius, alpha in zip(centers, radii, alphas.tolist()):
+                pygame.draw.circle(trail.surface, (*self.ripple_color, alpha), (x, y), radius,
+                                   line_width)
+            trail.draw(viz.canvas)
+            return
+
+        compositor = viz.compositor
+        compositor.begin(self.number)
+        for (x, y), radius, alpha in zip(centers, radii, alphas.tolist()):
+            s = compositor.element(circle_rect(x, y, radius))
+            pygame.draw.circle(s, (*self.ripple_color, alpha), (x, y), radius, line_width)
+            compositor.commit()
+        compositor.end(viz.canvas)
+
+    def element_count(self):
+        return len(self.ripples)
@@ -0,0 +1,99 @@
+import pygame
+
+
+class UICache:
+    """Fonts, text and button faces rendered once and reused every frame.
+
+    The style bar is composited into one surface that is only rebuilt when
+    the hovered or selected button changes, so drawing it is a single blit.
+    Call ``invalidate()`` after the layout changes (e.g. a window resize).
+    """
+
+    text_color = (255, 255, 255)
+
+    def __init__(self):
+        self.fonts = {}
+        self.texts = {}
+        self.faces = {}
+        self._bar = None
+        self._bar_state = None
+        self._bar_rect = None
+
+    def invalidate(self):
+        self.faces.clear()
+        self._bar = None
+        self._bar_state = None
+
+    def font(self, size: int) -> pygame.font.Font:
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.Font(None, size)
+        return font
+
+    def text(self, text: str, size: int, color=text_color) -> pygame.Surface:
+        key = (text, size, color)
+        surface = self.texts.get(key)
+        if surface is None:
+            surface = self.texts[key] = self.font(size).render(text, True, color)
+        return surface
+
+    # Style bar
+
+    def button_face(self, button: dict, hover: bool, selected: bool) -> pygame.Surface:
+        """Button (plus selection outline) on a transparent surface 2px larger per side"""
+        key = ('button', button['style_num'], hover, selected)
+        face = self.faces.get(key)
+        if face is not None:
+            return face
+        rect = button['rect']
+        face = pygame.Surface((rect.width + 4, rect.height + 4), pygame.SRCALPHA)
+        inner = pygame.Rect(2, 2, rect.width, rect.height)
+        if selected:
+            # Draw selection indicator
+            pygame.draw.rect(face, (255, 255, 255), face.get_rect(), 2, border_radius=5)
+        pygame.draw.rect(face, button['hover_color'] if hover else button['color'], inner, border_radius=5)
+        text = self.text(button['text'], 24)
+        face.blit(text, text.get_rect(center=inner.center))
+        self.faces[key] = face
+        return face
+
+    def style_bar(self, buttons, hover_style, selected_style):
+        """Composited style bar and its screen position"""
+        state = (hover_style, selected_style)
+        if self._bar is None or state != self._bar_state:
+            area = buttons[0]['rect'].unionall([b['rect'] for b in buttons[1:]]).inflate(4, 4)
+            if self._bar is None or self._bar.get_size() != area.size:
+                self._bar = pygame.Surface(area.size, pygame.SRCALPHA)
+            self._bar.fill((0, 0, 0, 0))
+            for button in buttons:
+                face = self.button_face(button, button['style_num'] == hover_style,
+                                        button['style_num'] == selected_style)
+                self._bar.blit(face, (button['rect'].x - 2 - area.x, button['rect'].y - 2 - area.y))
+            self._bar_rect = area
+            self._bar_state = state
+        return self._bar, self._bar_rect.topleft
+
+    # Start screen
+
+    def start_button(self, center, radius: int, color) -> pygame.Surface:
+        """Start button with its highlight and label, centred on the button"""
+        key = ('start', radius, color)
+        face = self.faces.get(key)
+        if face is not None:
+            return face
+        label = self.text("Start", 36)
+        half_width = max(radius, label.get_width() // 2) + 2
+        half_height = radius + 20 + label.get_height() // 2 + 2
+        face = pygame.Surface((half_width * 2, half_height * 2), pygame.SRCALPHA)
+        c = (half_width, half_height)
+
+        # Draw main circle button
+        pygame.draw.circle(face, color, c, radius)
+
+        # Add highlight effect
+        pygame.draw.circle(face, (255, 255, 255), (c[0], c[1] - 2), radius - 2, 2)
+
+        # "Start" text below the button
+        face.blit(label, label.get_rect(center=(c[0], c[1] + radius + 20)))
+        self.faces[key] = face
+        return face
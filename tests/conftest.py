@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Modules import their siblings directly (python music_visualization/xxx.py)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'music_visualization'))
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
@@ -0,0 +1,66 @@
+import numpy as np
+
+from audio_pipeline import AudioRingBuffer
+
+
+def positions(start, count):
+    # Sample k holds k + 1, so 0 only ever means the silence before the first write
+    return np.arange(start + 1, start + count + 1, dtype=np.float32)
+
+
+def expected_window(end, n):
+    window = np.zeros(n, dtype=np.float32)
+    start = max(0, end - n)
+    window[n - (end - start):] = positions(start, end - start)
+    return window
+
+
+def test_read_window_wraps_and_overlaps():
+    ring = AudioRingBuffer(32)
+    out = np.empty(8, dtype=np.float32)
+    ring.write(positions(0, 6))
+    assert ring.read_window(out, 4)
+    assert np.array_equal(out, expected_window(4, 8))  # Leading silence
+    for pos in range(6, 100, 6):
+        ring.write(positions(pos, 6))
+        while ring.read_window(out, 4):
+            assert np.array_equal(out, expected_window(ring.read_pos, 8))
+    assert ring.overflows == 0
+
+
+def test_overlapping_window_history_counts_as_a_lap():
+    capacity, n, hop = 32, 16, 4
+    ring = AudioRingBuffer(capacity)
+    out = np.empty(n, dtype=np.float32)
+    ring.write(positions(0, 20))
+    while ring.read_window(out, hop):
+        pass
+    # 24 unread samples fit, but the next window also rereads 12 older ones
+    ring.write(positions(20, 24))
+    assert ring.available() <= capacity
+    assert ring.overflows == 1
+    assert ring.read_window(out, hop)
+    assert np.array_equal(out, expected_window(ring.read_pos, n))
+    assert ring.read_pos - n >= ring.write_pos - capacity
+
+
+def test_random_writes_never_return_overwritten_windows():
+    rng = np.random.default_rng(1)
+    for n, hop in ((16, 16), (16, 4), (16, 1), (24, 7)):
+        ring = AudioRingBuffer(64)
+        out = np.empty(n, dtype=np.float32)
+        written = 0
+        for _ in range(2000):
+            count = int(rng.integers(1, 40))
+            overflows = ring.overflows
+            read_pos = ring.read_pos
+            ring.write(positions(written, count))
+            written += count
+            for _ in range(int(rng.integers(0, 4))):
+                if not ring.read_window(out, hop):
+                    break
+                assert np.array_equal(out, expected_window(ring.read_pos, n))
+                skipped = ring.read_pos - hop != read_pos
+                # Every skip over lost audio was counted
+                assert not skipped or ring.overflows > overflows
+                read_pos = ring.read_pos
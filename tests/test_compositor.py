@@ -0,0 +1,55 @@
+import pygame
+
+from compositor import TrailBuffer
+
+
+def blitted(trail, background):
+    target = pygame.Surface(trail.size)
+    target.fill(background)
+    trail.draw(target)
+    return tuple(target.get_at((0, 0)))[:3]
+
+
+def test_trail_fade_reaches_zero():
+    trail = TrailBuffer((4, 4))
+    trail.surface.fill((100, 200, 255, 255))
+    # A long trail: plain MULT rounding left alpha <= 25 stuck at this factor
+    factor = 246
+    for _ in range(2000):
+        trail.fade(factor)
+        if trail.surface.get_at((0, 0)).a == 0:
+            break
+    assert trail.surface.get_at((0, 0)).a == 0
+
+
+def test_trail_fade_length_follows_factor():
+    frames = 60
+    trail = TrailBuffer((1, 1))
+    trail.surface.fill((255, 255, 255, 255))
+    factor = TrailBuffer.fade_factor(frames)
+    for _ in range(frames):
+        trail.fade(factor)
+    # Gone within the requested length, but not faded out immediately
+    assert trail.surface.get_at((0, 0)).a == 0
+    trail.surface.fill((255, 255, 255, 255))
+    for _ in range(frames // 4):
+        trail.fade(factor)
+    assert trail.surface.get_at((0, 0)).a > 32
+
+
+def test_trail_fade_blends_colour_out_over_background():
+    background = (15, 15, 35)
+    colour = (100, 200, 255)
+    frames = 139  # 50 blocks of 2048 samples at 44.1 kHz, shown at 60 FPS
+    trail = TrailBuffer((1, 1))
+    trail.surface.fill((*colour, 255))
+    factor = TrailBuffer.fade_factor(frames)
+    for n in range(1, frames + 1):
+        trail.fade(factor)
+        pixel = blitted(trail, background)
+        # Only alpha fades: between the colour and the background, never darker
+        assert tuple(trail.surface.get_at((0, 0)))[:3] == colour
+        assert all(bg <= p <= c for bg, p, c in zip(background, pixel, colour))
+        if n <= frames * 2 // 3:
+            assert pixel != background
+    assert blitted(trail, background) == background
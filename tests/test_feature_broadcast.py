@@ -0,0 +1,46 @@
+import time
+
+import numpy as np
+
+from audio_pipeline import FeatureSnapshot
+from feature_broadcast import FeaturePublisher, FeatureSubscriber
+
+
+def snapshot(seq, beats):
+    bands = np.full(100, seq % 7, dtype=np.float32)
+    return FeatureSnapshot(seq, seq * 0.01, 0.5, None, bands, beat=seq % 10 == 0, beats=beats)
+
+
+def test_loopback_counts_lost_and_late_packets():
+    subscriber = FeatureSubscriber('127.0.0.1:0', timeout=0.05)
+    port = subscriber.sock.getsockname()[1]
+    publisher = FeaturePublisher(f'127.0.0.1:{port}', 44100, 2048, 512, 100)
+    publisher.rng = np.random.default_rng(3)
+    subscriber.start()
+    try:
+        beats = 0
+        for seq in range(1, 401):
+            beats += seq % 10 == 0
+            if seq == 2:
+                # The first packet starts the session: losses before it cannot be seen
+                publisher.loss, publisher.reorder = 0.1, 0.05
+            elif seq == 400:
+                # Last packet always goes out, and releases any held one
+                publisher.loss = publisher.reorder = 0.0
+            publisher.publish(snapshot(seq, beats))
+            if seq % 50 == 0:
+                time.sleep(0.01)  # Stay within the socket's receive buffer
+        deadline = time.perf_counter() + 2.0
+        while subscriber.received < publisher.sent and time.perf_counter() < deadline:
+            time.sleep(0.01)
+    finally:
+        subscriber.stop()
+        publisher.close()
+
+    stats = subscriber.stats()
+    assert publisher.simulated_drops > 0 and stats['late'] > 0
+    assert stats['received'] == publisher.sent == 400 - publisher.simulated_drops
+    assert stats['lost'] == publisher.simulated_drops
+    # Beats in dropped packets still count: every packet carries the running total
+    assert subscriber.latest.seq == 400 and subscriber.latest.beats == 40
+    assert np.array_equal(subscriber.latest.bands, np.full(100, 400 % 7, dtype=np.float32))